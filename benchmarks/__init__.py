@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Bookstore Management System simulation
+Run a module with `python -m benchmarks.<name>` from the repository root
+"""
@@ -0,0 +1,62 @@
+"""
+Compare bulk ontology construction with creating individuals one property
+at a time, and time full model construction
+
+Usage: python -m benchmarks.construction [num_customers ...]
+"""
+import sys
+import time
+
+from owlready2 import World
+
+from bookstore_system import BookstoreModel, OntologyBuilder, create_ontology
+
+def per_property(num_customers):
+    """Seconds to create the customer individuals the way the agents used to"""
+    world = World()
+    onto = create_ontology(world)
+    start = time.perf_counter()
+    for i in range(num_customers):
+        customer = onto.Customer(f"customer_{i}")
+        customer.hasId = [str(i)]
+        customer.hasName = [f"Customer_{i}"]
+        customer.hasBudget = [100.0]
+    elapsed = time.perf_counter() - start
+    world.close()
+    return elapsed
+
+def bulk(num_customers):
+    """Seconds to create the same individuals with an OntologyBuilder"""
+    world = World()
+    onto = create_ontology(world)
+    start = time.perf_counter()
+    builder = OntologyBuilder(onto, reuse_existing=False)
+    for i in range(num_customers):
+        builder.individual("Customer", f"customer_{i}", hasId=str(i), hasName=f"Customer_{i}",
+                           hasBudget=100.0)
+    builder.commit()
+    elapsed = time.perf_counter() - start
+    assert len(list(onto.Customer.instances())) == num_customers
+    world.close()
+    return elapsed
+
+def model_construction(num_customers, num_books=15):
+    """Seconds to construct a whole BookstoreModel"""
+    start = time.perf_counter()
+    model = BookstoreModel(num_customers=num_customers, num_employees=2, num_books=num_books,
+                           log_mode="quiet", seed=0)
+    elapsed = time.perf_counter() - start
+    model.close()
+    return elapsed
+
+def main(argv=None):
+    sizes = [int(arg) for arg in (argv or [])] or [10_000, 100_000]
+    print(f"{'customers':>10} {'per property (s)':>17} {'bulk (s)':>9} {'speedup':>8} {'model (s)':>10}")
+    for size in sizes:
+        slow = per_property(size)
+        fast = bulk(size)
+        print(f"{size:>10} {slow:>17.2f} {fast:>9.2f} {slow / fast:>7.1f}x "
+              f"{model_construction(size):>10.2f}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,149 @@
+"""
+Benchmark suite for the simulation hot paths
+
+Times BookstoreModel.step() and the work inside it (customer browsing,
+employee restocking, message bus fan-out, the model reporters and ontology
+writes) at several model sizes, with ontology writes on and off, and emits
+the results as JSON so runs of different versions can be compared.
+
+By default customers are scaled at 15 books and books at 1,000 customers;
+passing --customers or --books runs every combination of the given sizes.
+
+Usage: python -m benchmarks.hot_paths [--customers 10 1000 ...] [--books 15 ...]
+                                      [--steps 10] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from bookstore_system import BookstoreModel
+
+CUSTOMER_SCALE = [10, 1_000, 10_000, 100_000]  # at 15 books
+BOOK_SCALE = [15, 1_000, 100_000]  # at 1,000 customers
+
+def timed(fn, repeats=1):
+    """Mean seconds per call of fn over repeats calls"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def per_call(fn, items):
+    """Mean seconds per fn(item) over items"""
+    if not items:
+        return None
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items)
+
+def run(num_customers, num_books, ontology, steps=10, warmup_steps=3, sample=1000, seed=0):
+    """Benchmark one model configuration; times are in milliseconds"""
+    start = time.perf_counter()
+    model = BookstoreModel(num_customers=num_customers, num_employees=2, num_books=num_books,
+                           ontology_mode="step" if ontology else "off",
+                           log_mode="quiet", seed=seed)
+    setup_time = time.perf_counter() - start
+
+    for _ in range(warmup_steps):
+        model.step()
+    step_time = timed(model.step, steps)
+
+    rng = np.random.default_rng(seed)
+    customers = [model.customers[i] for i in
+                 rng.choice(len(model.customers), min(sample, len(model.customers)), replace=False)]
+    books = list(model.books.values())
+
+    # Publishing a topic every customer subscribes to but ignores measures
+    # pure dispatch cost
+    bus = model.message_bus
+    fan_out = len(bus.subscribers["price_update"])
+    publish_time = timed(lambda: bus.publish("price_update", {"book_id": 0, "new_price": 1.0}), 20)
+
+    collect_time = timed(lambda: model.datacollector.collect(model), 100)
+
+    results = {
+        "customers": num_customers,
+        "books": len(model.books),
+        "ontology": ontology,
+        "setup_ms": setup_time * 1000,
+        "step_ms": step_time * 1000,
+        "steps_per_second": 1 / step_time if step_time else None,
+        "browse_and_purchase_us": per_call(lambda c: c.browse_and_purchase(), customers) * 1e6,
+        "check_and_restock_us": per_call(lambda e: e.check_and_restock(), model.employees) * 1e6,
+        "publish_fan_out": fan_out,
+        "publish_ms": publish_time * 1000,
+        "reporters_us": collect_time * 1e6,
+        "ontology_flush_ms": None,
+        "orders_exported": None,
+        "ontology_export_ms": None
+    }
+
+    if ontology:
+        # One flush of a step's worth of buffered writes: every book's stock
+        # and price plus a purchase per sampled customer
+        sync = model.ontology_sync
+        for book in books:
+            sync.record_stock(book)
+            sync.record_price(book)
+        for customer in customers:
+            sync.record_purchase(customer, books[0])
+        results["ontology_flush_ms"] = timed(sync.flush) * 1000
+
+        # Exporting the ledger's orders into the ontology
+        results["orders_exported"] = len(model.order_ledger) - model.order_ledger.exported
+        results["ontology_export_ms"] = timed(model.sync_ontology) * 1000
+
+    model.close()
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths")
+    parser.add_argument("--customers", type=int, nargs="+", default=None)
+    parser.add_argument("--books", type=int, nargs="+", default=None)
+    parser.add_argument("--ontology", choices=("on", "off", "both"), default="both")
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    ontology_modes = {"on": [True], "off": [False], "both": [True, False]}[args.ontology]
+
+    if args.customers is None and args.books is None:
+        sizes = ([(num_customers, 15) for num_customers in CUSTOMER_SCALE]
+                 + [(1_000, num_books) for num_books in BOOK_SCALE if num_books != 15])
+    else:
+        sizes = [(num_customers, num_books) for num_books in args.books or [15]
+                 for num_customers in args.customers or [1_000]]
+
+    results = []
+    for num_customers, num_books in sizes:
+        for ontology in ontology_modes:
+            result = run(num_customers, num_books, ontology, steps=args.steps, seed=args.seed)
+            results.append(result)
+            print(f"customers={num_customers} books={result['books']} ontology={ontology}: "
+                  f"{result['step_ms']:.2f} ms/step", file=sys.stderr)
+
+    report = {
+        "benchmark": "hot_paths",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
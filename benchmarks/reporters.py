@@ -0,0 +1,61 @@
+"""
+Compare the incremental model reporters with full-pass reporters
+
+Usage: python -m benchmarks.reporters [num_customers ...]
+"""
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from bookstore_system import BookstoreModel, MODEL_REPORTERS
+
+# The reporters as they were before the running aggregates: one pass over
+# every book or customer per reporter per step
+FULL_PASS_REPORTERS = {
+    "Total Books": lambda m: len(m.books),
+    "Total Stock": lambda m: sum(b.stock for b in m.books.values()),
+    "Total Sales": lambda m: sum(b.total_sales for b in m.books.values()),
+    "Average Customer Budget": lambda m: np.mean([c.budget for c in m.customers]),
+    "Customer Satisfaction": lambda m: np.mean([c.satisfaction for c in m.customers])
+}
+
+def collect_time(model, reporters, repeats):
+    """Mean seconds to evaluate every reporter once, and the values"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        values = {name: reporter(model) for name, reporter in reporters.items()}
+    return (time.perf_counter() - start) / repeats, values
+
+def run(num_customers, warmup_steps=5, repeats=20):
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = BookstoreModel(num_customers=num_customers, num_employees=2, num_books=15)
+        for _ in range(warmup_steps):
+            model.step()
+    
+    full_time, full_values = collect_time(model, FULL_PASS_REPORTERS, repeats)
+    incremental_time, incremental_values = collect_time(model, MODEL_REPORTERS, repeats)
+    
+    for name in full_values:
+        if not np.isclose(full_values[name], incremental_values[name], rtol=1e-12, atol=0):
+            raise AssertionError(f"{name}: full pass {full_values[name]} != incremental {incremental_values[name]}")
+    
+    return {
+        "num_customers": num_customers,
+        "full_pass_ms": full_time * 1000,
+        "incremental_ms": incremental_time * 1000,
+        "speedup": full_time / incremental_time if incremental_time else float("inf")
+    }
+
+def main(argv=None):
+    sizes = [int(arg) for arg in (argv or [])] or [10_000, 100_000]
+    print(f"{'customers':>10} {'full pass (ms)':>15} {'incremental (ms)':>17} {'speedup':>9}")
+    for size in sizes:
+        result = run(size)
+        print(f"{result['num_customers']:>10} {result['full_pass_ms']:>15.3f} "
+              f"{result['incremental_ms']:>17.4f} {result['speedup']:>8.0f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,168 +1,911 @@
+import cProfile
+import itertools
+import pstats
 import random
+import threading
 import time
 from owlready2 import *
 from mesa import Agent, Model
 from mesa.time import RandomActivation
 from mesa.space import MultiGrid
-from mesa.datacollection import DataCollector
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, deque
 import json
+import os
+import zlib
+from vectorized_engine import VectorizedEngine
+from catalog_generator import generate_catalog
 
-# Set up ontology
-onto = get_ontology("http://bookstore.ontology/")
+ONTOLOGY_IRI = "http://bookstore.ontology/"
 
-# Define ontology classes and properties
-with onto:
-    # Define Classes
-    class Book(Thing):
-        pass
+def create_ontology(world=None):
+    """Create (or reopen) the bookstore ontology in the given owlready2 world"""
+    world = world or default_world
+    onto = world.get_ontology(ONTOLOGY_IRI)
     
-    class Customer(Thing):
-        pass
+    # Define ontology classes and properties
+    with onto:
+        # Define Classes
+        class Book(Thing):
+            pass
+        
+        class Customer(Thing):
+            pass
+        
+        class Employee(Thing):
+            pass
+        
+        class Order(Thing):
+            pass
+        
+        class Inventory(Thing):
+            pass
+        
+        class Genre(Thing):
+            pass
+        
+        class Author(Thing):
+            pass
+        
+        # Define Object Properties
+        class hasAuthor(ObjectProperty):
+            domain = [Book]
+            range = [Author]
+        
+        class hasGenre(ObjectProperty):
+            domain = [Book]
+            range = [Genre]
+        
+        class purchases(ObjectProperty):
+            domain = [Customer]
+            range = [Book]
+        
+        class worksAt(ObjectProperty):
+            domain = [Employee]
+            range = [Thing]  # Bookstore
+        
+        class hasInventory(ObjectProperty):
+            domain = [Thing]  # Bookstore
+            range = [Inventory]
+        
+        class contains(ObjectProperty):
+            domain = [Inventory]
+            range = [Book]
+        
+        class creates(ObjectProperty):
+            domain = [Customer]
+            range = [Order]
+        
+        class fulfills(ObjectProperty):
+            domain = [Employee]
+            range = [Order]
+        
+        # Define Data Properties
+        class hasPrice(DataProperty):
+            domain = [Book]
+            range = [float]
+        
+        class availableQuantity(DataProperty):
+            domain = [Book]
+            range = [int]
+        
+        class hasName(DataProperty):
+            domain = [Thing]
+            range = [str]
+        
+        class hasId(DataProperty):
+            domain = [Thing]
+            range = [str]
+        
+        class hasBudget(DataProperty):
+            domain = [Customer]
+            range = [float]
+        
+        class restockThreshold(DataProperty):
+            domain = [Book]
+            range = [int]
+        
+        class totalSales(DataProperty):
+            domain = [Book]
+            range = [int]
+        
+        class timestamp(DataProperty):
+            domain = [Order]
+            range = [float]
+        
+    return onto
+
+# Fixed-size ring buffer of retained messages, addressed by sequence number
+class RingBuffer:
+    def __init__(self, capacity, window=None):
+        self.capacity = capacity
+        self.window = window  # seconds; older messages are skipped when read
+        self.items = [None] * capacity
+        self.times = [0.0] * capacity if window is not None else None
+        self.total = 0  # messages ever appended; the next sequence number
     
-    class Employee(Thing):
-        pass
+    def __len__(self):
+        return min(self.total, self.capacity)
     
-    class Order(Thing):
-        pass
+    @property
+    def first(self):
+        """Sequence number of the oldest message still held"""
+        return max(0, self.total - self.capacity)
     
-    class Inventory(Thing):
-        pass
+    def append(self, item):
+        if self.capacity:
+            index = self.total % self.capacity
+            self.items[index] = item
+            if self.times is not None:
+                self.times[index] = time.monotonic()
+        self.total += 1
     
-    class Genre(Thing):
-        pass
+    def read(self, cursor=0, limit=None):
+        """Return (messages from cursor on, next cursor)"""
+        start = max(cursor, self.first)
+        if self.times is not None:
+            cutoff = time.monotonic() - self.window
+            while start < self.total and self.times[start % self.capacity] < cutoff:
+                start += 1
+        stop = self.total if limit is None else min(self.total, start + limit)
+        return [self.items[i % self.capacity] for i in range(start, stop)], stop
+
+# Message Bus for agent communication
+class MessageBus:
+    MODES = ("sync", "batched")
+    RETENTION_POLICIES = ("last", "window", "count")
+    DEFAULT_RETENTION = 1000  # messages kept per topic unless configured
     
-    class Author(Thing):
-        pass
+    def __init__(self, mode="sync", max_rounds=3):
+        self.messages = {}  # topic -> RingBuffer of retained messages
+        self.retention = {}  # topic -> (policy, limit, window)
+        self.subscribers = defaultdict(list)
+        self.queues = defaultdict(deque)
+        self.max_rounds = max_rounds
+        self.set_mode(mode)
+        
+        # Throughput and queue depth counters
+        self.published = defaultdict(int)
+        self.delivered = defaultdict(int)
+        self.max_queue_depth = defaultdict(int)
+        self.drain_time = 0.0
     
-    # Define Object Properties
-    class hasAuthor(ObjectProperty):
-        domain = [Book]
-        range = [Author]
+    def set_mode(self, mode):
+        """Switch between synchronous delivery and per-topic batched queues"""
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown message bus mode: {mode}")
+        self.mode = mode
     
-    class hasGenre(ObjectProperty):
-        domain = [Book]
-        range = [Genre]
+    def set_retention(self, topic, policy="last", limit=DEFAULT_RETENTION, window=None):
+        """Configure how many of a topic's messages are kept.
+        
+        "last" keeps the last `limit` messages, "window" keeps those from the
+        last `window` seconds (at most `limit`), and "count" keeps none and
+        only counts them. Already retained messages are discarded.
+        """
+        if policy not in self.RETENTION_POLICIES:
+            raise ValueError(f"Unknown retention policy: {policy}")
+        if policy == "window" and window is None:
+            raise ValueError("The window retention policy needs a window in seconds")
+        if policy == "count":
+            limit = 0
+        self.retention[topic] = (policy, limit, window if policy == "window" else None)
+        total = self.messages[topic].total if topic in self.messages else 0
+        self.messages[topic] = RingBuffer(limit, self.retention[topic][2])
+        self.messages[topic].total = total
     
-    class purchases(ObjectProperty):
-        domain = [Customer]
-        range = [Book]
+    def subscribe(self, topic, agent):
+        """Subscribe an agent to a topic"""
+        self.subscribers[topic].append(agent)
+    
+    def publish(self, topic, message):
+        """Publish a message to a topic"""
+        if topic not in self.messages:
+            self.messages[topic] = RingBuffer(self.DEFAULT_RETENTION)
+        self.messages[topic].append(message)
+        self.published[topic] += 1
+        
+        if self.mode == "batched":
+            # Queue until the next drain() instead of delivering recursively
+            queue = self.queues[topic]
+            queue.append(message)
+            self.max_queue_depth[topic] = max(self.max_queue_depth[topic], len(queue))
+            return
+        
+        # Notify all subscribers
+        for agent in self.subscribers[topic]:
+            agent.receive_message(topic, message)
+        self.delivered[topic] += len(self.subscribers[topic])
     
-    class worksAt(ObjectProperty):
-        domain = [Employee]
-        range = [Thing]  # Bookstore
+    def drain(self, topics=None):
+        """Deliver queued messages to subscribers in per-topic batches.
+        
+        Subscribers with a receive_batch(topic, messages) method get each
+        topic's batch in one call, others get receive_message per message.
+        Messages published while draining are delivered in the next round;
+        after max_rounds they stay queued for the next drain.
+        """
+        start = time.perf_counter()
+        delivered = 0
+        for _ in range(self.max_rounds):
+            pending = [topic for topic in (topics or list(self.queues)) if self.queues[topic]]
+            if not pending:
+                break
+            for topic in pending:
+                batch = list(self.queues[topic])
+                self.queues[topic].clear()
+                for agent in self.subscribers[topic]:
+                    receive_batch = getattr(agent, "receive_batch", None)
+                    if receive_batch is not None:
+                        receive_batch(topic, batch)
+                    else:
+                        for message in batch:
+                            agent.receive_message(topic, message)
+                self.delivered[topic] += len(batch) * len(self.subscribers[topic])
+                delivered += len(batch) * len(self.subscribers[topic])
+        self.drain_time += time.perf_counter() - start
+        return delivered
     
-    class hasInventory(ObjectProperty):
-        domain = [Thing]  # Bookstore
-        range = [Inventory]
+    def queue_depth(self, topic=None):
+        """Number of messages waiting in one topic's queue, or in all queues"""
+        if topic is not None:
+            return len(self.queues[topic])
+        return sum(len(queue) for queue in self.queues.values())
     
-    class contains(ObjectProperty):
-        domain = [Inventory]
-        range = [Book]
+    def read_messages(self, topic, cursor=0, limit=None):
+        """Return (retained messages with sequence >= cursor, next cursor).
+        
+        Pass the returned cursor back in to read only newer messages. If the
+        cursor points to messages already evicted, reading resumes at the
+        oldest retained one.
+        """
+        if topic not in self.messages:
+            return [], cursor
+        return self.messages[topic].read(cursor, limit)
     
-    class creates(ObjectProperty):
-        domain = [Customer]
-        range = [Order]
+    def get_messages(self, topic, cursor=0, limit=None):
+        """Get the retained messages for a topic, optionally from a cursor on"""
+        return self.read_messages(topic, cursor, limit)[0]
+
+# Catalog of in-stock books indexed by genre and price band
+class BookCatalog:
+    def __init__(self, band_width=5.0):
+        self.band_width = band_width
+        self.buckets = defaultdict(list)  # (genre, band) -> in-stock books
+        self.genre_bands = defaultdict(set)  # genre -> non-empty bands
+        self.positions = {}  # book id -> ((genre, band), index in bucket)
     
-    class fulfills(ObjectProperty):
-        domain = [Employee]
-        range = [Order]
+    def __len__(self):
+        return len(self.positions)
     
-    # Define Data Properties
-    class hasPrice(DataProperty):
-        domain = [Book]
-        range = [float]
+    def __contains__(self, book):
+        return book.unique_id in self.positions
     
-    class availableQuantity(DataProperty):
-        domain = [Book]
-        range = [int]
+    def price_band(self, price):
+        """Return the price band a price falls into"""
+        return int(price // self.band_width)
     
-    class hasName(DataProperty):
-        domain = [Thing]
-        range = [str]
+    def add(self, book):
+        """Index an in-stock book under its genre and price band"""
+        if book.unique_id in self.positions:
+            return
+        key = (book.genre, self.price_band(book.price))
+        bucket = self.buckets[key]
+        self.positions[book.unique_id] = (key, len(bucket))
+        bucket.append(book)
+        self.genre_bands[book.genre].add(key[1])
     
-    class hasId(DataProperty):
-        domain = [Thing]
-        range = [str]
+    def remove(self, book):
+        """Drop a book from the index (swap-with-last, O(1))"""
+        entry = self.positions.pop(book.unique_id, None)
+        if entry is None:
+            return
+        key, index = entry
+        bucket = self.buckets[key]
+        last = bucket.pop()
+        if last is not book:
+            bucket[index] = last
+            self.positions[last.unique_id] = (key, index)
+        if not bucket:
+            del self.buckets[key]
+            self.genre_bands[key[0]].discard(key[1])
     
-    class hasBudget(DataProperty):
-        domain = [Customer]
-        range = [float]
+    def update_price(self, book):
+        """Move a book to its new price band after a price change"""
+        entry = self.positions.get(book.unique_id)
+        if entry is not None and entry[0][1] != self.price_band(book.price):
+            self.remove(book)
+            self.add(book)
     
-    class restockThreshold(DataProperty):
-        domain = [Book]
-        range = [int]
+    def books(self):
+        """Return all in-stock books, in id order"""
+        books = [book for bucket in self.buckets.values() for book in bucket]
+        return sorted(books, key=lambda book: book.unique_id)
     
-    class timestamp(DataProperty):
-        domain = [Order]
-        range = [float]
+    def sample(self, genres=None, max_price=None, rng=random, max_tries=8):
+        """Pick a uniformly random in-stock book from the given genres.
+        
+        If max_price is given only affordable books are considered. Returns
+        None when no book matches. Cost depends on the number of genres and
+        price bands, not on the number of books.
+        """
+        if genres is None:
+            genres = list(self.genre_bands)
+        max_band = None if max_price is None else self.price_band(max_price)
+        
+        candidates = []
+        total = 0
+        for genre in genres:
+            for band in self.genre_bands.get(genre, ()):
+                if max_band is None or band <= max_band:
+                    bucket = self.buckets[(genre, band)]
+                    candidates.append(bucket)
+                    total += len(bucket)
+        if total == 0:
+            return None
+        
+        # Only the top band can hold books above max_price, so rejection
+        # sampling keeps the pick uniform over affordable books
+        for _ in range(max_tries):
+            index = rng.randrange(total)
+            for bucket in candidates:
+                if index < len(bucket):
+                    book = bucket[index]
+                    break
+                index -= len(bucket)
+            if max_price is None or book.price <= max_price:
+                return book
+        
+        affordable = [book for bucket in candidates for book in bucket
+                      if book.price <= max_price]
+        return rng.choice(affordable) if affordable else None
 
-# Message Bus for agent communication
-class MessageBus:
+# Queues new individuals and their triples during model construction and
+# writes them to the quadstore in one transaction with executemany, instead of
+# several SQL statements per property. Individuals that already exist (in a
+# resumed store) are reused as they are.
+class OntologyBuilder:
+    def __init__(self, onto, reuse_existing=True):
+        self.onto = onto
+        self.graph = onto.world.graph
+        self.c = onto.graph.c
+        self.reuse_existing = reuse_existing  # look up each IRI first; off for fresh worlds
+        self.resources = []  # (storid, iri)
+        self.objs = []  # (s, p, o)
+        self.datas = []  # (s, p, o, d)
+        self.classes = {}  # class name -> storid
+        self.properties = {}  # property name -> (storid, is data property)
+        self.last_storid = None
+        self.created = 0
+    
+    def lookup(self, name):
+        entity = self.onto[name]
+        if isinstance(entity, ThingClass):
+            self.classes[name] = entity.storid
+        else:
+            self.properties[name] = (entity.storid, issubclass(entity, DataProperty))
+    
+    def individual(self, class_name, name, **properties):
+        """Queue an individual of the named class with one value per property.
+        
+        Object property values are storids of other individuals. Returns the
+        new individual's storid.
+        """
+        iri = f"{self.onto.base_iri}{name}"
+        if self.reuse_existing:
+            storid = self.graph._abbreviate(iri, create_if_missing=False)
+            if storid is not None:
+                return storid
+        if class_name not in self.classes:
+            self.lookup(class_name)
+        
+        # Storids are allocated locally and the store counter is updated on commit
+        if self.last_storid is None:
+            self.last_storid = self.graph.execute("SELECT current_resource FROM store").fetchone()[0]
+        self.last_storid += 1
+        storid = self.last_storid
+        self.resources.append((storid, iri))
+        self.objs.append((storid, rdf_type, owl_named_individual))
+        self.objs.append((storid, rdf_type, self.classes[class_name]))
+        for prop_name, value in properties.items():
+            if prop_name not in self.properties:
+                self.lookup(prop_name)
+            prop, is_data = self.properties[prop_name]
+            if is_data:
+                self.datas.append((storid, prop, *to_literal(value)))
+            else:
+                self.objs.append((storid, prop, value))
+        self.created += 1
+        return storid
+    
+    def commit(self):
+        """Write every queued individual and triple in one transaction"""
+        if not self.resources:
+            return 0
+        db = self.graph.db
+        db.executemany("INSERT INTO resources VALUES (?,?)", self.resources)
+        db.executemany(f"INSERT OR IGNORE INTO objs VALUES ({self.c},?,?,?)", self.objs)
+        db.executemany(f"INSERT OR IGNORE INTO datas VALUES ({self.c},?,?,?,?)", self.datas)
+        db.execute("UPDATE store SET current_resource=?", (self.last_storid,))
+        self.graph.analyze()
+        
+        written = len(self.resources)
+        self.resources, self.objs, self.datas = [], [], []
+        self.last_storid = None
+        return written
+
+# Buffers ontology mutations made during a step and applies them in batches
+class OntologySync:
+    MODES = ("off", "step", "interval")
+    
+    def __init__(self, onto, mode="step", interval=1):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown ontology sync mode: {mode}")
+        self.onto = onto
+        self.mode = mode
+        self.interval = max(1, interval)
+        self.steps = 0
+        self.flushes = 0
+        self.mutations_applied = 0
+        self.stock_updates = {}  # book id -> book agent
+        self.price_updates = {}  # book id -> book agent
+        self.budget_updates = {}  # customer id -> customer agent
+        self.purchases = []  # (customer storid, book storid)
+    
+    @property
+    def enabled(self):
+        return self.mode != "off"
+    
+    def pending(self):
+        """Number of buffered mutations waiting for the next flush"""
+        return (len(self.stock_updates) + len(self.price_updates) + len(self.budget_updates)
+                + len(self.purchases))
+    
+    def record_stock(self, book_agent):
+        if self.enabled:
+            self.stock_updates[book_agent.unique_id] = book_agent
+    
+    def record_price(self, book_agent):
+        if self.enabled:
+            self.price_updates[book_agent.unique_id] = book_agent
+    
+    def record_purchase(self, customer_agent, book_agent):
+        if self.enabled:
+            self.budget_updates[customer_agent.unique_id] = customer_agent
+            self.purchases.append((customer_agent.onto_storid, book_agent.onto_storid))
+    
+    def end_step(self):
+        """Called at the end of every model step; flushes according to the mode"""
+        self.steps += 1
+        if self.mode == "step" or (self.mode == "interval" and self.steps % self.interval == 0):
+            self.flush()
+    
+    def flush(self):
+        """Apply all buffered mutations to the ontology in one batch"""
+        if not self.pending():
+            return
+        onto = self.onto
+        
+        # Only the latest stock, price and budget of each agent needs to be
+        # written; they go to the quadstore by storid in one batch, so no
+        # individuals are loaded
+        values = []  # (storid, property name, value)
+        for book_agent in self.stock_updates.values():
+            values.append((book_agent.onto_storid, "availableQuantity", book_agent.stock))
+            values.append((book_agent.onto_storid, "totalSales", book_agent.total_sales))
+        for book_agent in self.price_updates.values():
+            values.append((book_agent.onto_storid, "hasPrice", book_agent.price))
+        for customer_agent in self.budget_updates.values():
+            values.append((customer_agent.onto_storid, "hasBudget", customer_agent.budget))
+        self.write_data(values)
+        
+        # Purchases are written straight to the quadstore, so no growing
+        # property lists are kept alive in Python
+        touched = set()
+        for customer, book in self.purchases:
+            onto._add_obj_triple_spo(customer, onto.purchases.storid, book)
+            touched.add(customer)
+        
+        # Drop owlready2's cached property lists so they reload from the quadstore
+        for customer in touched:
+            entity = onto.world._entities.get(customer)
+            if entity is not None:
+                entity.__dict__.pop("purchases", None)
+        for storid, name, _ in values:
+            entity = onto.world._entities.get(storid)
+            if entity is not None:
+                entity.__dict__.pop(name, None)
+        
+        self.mutations_applied += self.pending()
+        self.flushes += 1
+        self.stock_updates.clear()
+        self.price_updates.clear()
+        self.budget_updates.clear()
+        self.purchases.clear()
+
+    def write_data(self, values):
+        """Replace functional data property values, given as (storid, property name, value)"""
+        if not values:
+            return
+        onto = self.onto
+        properties = {name: onto[name].storid for name in {name for _, name, _ in values}}
+        rows = [(storid, properties[name], *to_literal(value)) for storid, name, value in values]
+        db = onto.world.graph.db
+        db.executemany("DELETE FROM datas WHERE s=? AND p=?", [row[:2] for row in rows])
+        db.executemany(f"INSERT INTO datas VALUES ({onto.graph.c},?,?,?,?)", rows)
+
+# Append-only columnar log of orders, stored in fixed-size NumPy chunks
+class OrderLedger:
+    COLUMNS = {
+        "customer_id": np.int64,
+        "book_id": np.int64,
+        "price": np.float64,
+        "step": np.int64,
+        "wall_time": np.float64
+    }
+    
+    def __init__(self, chunk_size=65536):
+        self.chunk_size = chunk_size
+        self.chunks = []  # list of {column: array of chunk_size}
+        self.size = 0
+        self.exported = 0  # orders already written to the ontology
+    
+    def __len__(self):
+        return self.size
+    
+    def _new_chunk(self):
+        self.chunks.append({name: np.empty(self.chunk_size, dtype=dtype)
+                            for name, dtype in self.COLUMNS.items()})
+    
+    def append(self, customer_id, book_id, price, step, wall_time=None):
+        """Record a single order"""
+        if self.size == len(self.chunks) * self.chunk_size:
+            self._new_chunk()
+        chunk = self.chunks[-1]
+        i = self.size % self.chunk_size
+        chunk["customer_id"][i] = customer_id
+        chunk["book_id"][i] = book_id
+        chunk["price"][i] = price
+        chunk["step"][i] = step
+        chunk["wall_time"][i] = time.time() if wall_time is None else wall_time
+        self.size += 1
+    
+    def extend(self, customer_ids, book_ids, prices, step, wall_time=None):
+        """Record a batch of orders placed in the same step"""
+        count = len(customer_ids)
+        columns = {
+            "customer_id": customer_ids,
+            "book_id": book_ids,
+            "price": prices,
+            "step": np.full(count, step),
+            "wall_time": np.full(count, time.time() if wall_time is None else wall_time)
+        }
+        written = 0
+        while written < count:
+            if self.size == len(self.chunks) * self.chunk_size:
+                self._new_chunk()
+            chunk = self.chunks[-1]
+            start = self.size % self.chunk_size
+            n = min(count - written, self.chunk_size - start)
+            for name, values in columns.items():
+                chunk[name][start:start + n] = values[written:written + n]
+            written += n
+            self.size += n
+    
+    def column(self, name, start=0, stop=None):
+        """Return a column (or a row range of it) as one contiguous array"""
+        stop = self.size if stop is None else min(stop, self.size)
+        parts = []
+        for index, chunk in enumerate(self.chunks):
+            lo = max(start - index * self.chunk_size, 0)
+            hi = min(stop - index * self.chunk_size, self.chunk_size)
+            if lo < hi:
+                parts.append(chunk[name][lo:hi])
+        if not parts:
+            return np.empty(0, dtype=self.COLUMNS[name])
+        return np.concatenate(parts)
+    
+    def query(self, customer_id=None, book_id=None, min_step=None, max_step=None):
+        """Return the matching orders as a dict of column arrays"""
+        mask = np.ones(self.size, dtype=bool)
+        if customer_id is not None:
+            mask &= np.isin(self.column("customer_id"), np.atleast_1d(customer_id))
+        if book_id is not None:
+            mask &= np.isin(self.column("book_id"), np.atleast_1d(book_id))
+        if min_step is not None or max_step is not None:
+            steps = self.column("step")
+            if min_step is not None:
+                mask &= steps >= min_step
+            if max_step is not None:
+                mask &= steps <= max_step
+        return {name: self.column(name)[mask] for name in self.COLUMNS}
+    
+    def export_to_ontology(self, onto):
+        """Create Order individuals for orders not yet exported to the ontology"""
+        if self.exported == self.size:
+            return 0
+        rows = {name: self.column(name, self.exported).tolist() for name in self.COLUMNS}
+        world = onto.world
+        touched = set()
+        
+        # Written as raw triples, so no Order objects are kept alive in Python
+        for customer_id, book_id, wall_time in zip(rows["customer_id"], rows["book_id"],
+                                                   rows["wall_time"]):
+            order = world._abbreviate(f"{onto.base_iri}order_{customer_id}_{book_id}_{wall_time}")
+            customer = world._abbreviate(f"{onto.base_iri}customer_{customer_id}")
+            onto._add_obj_triple_spo(order, rdf_type, owl_named_individual)
+            onto._add_obj_triple_spo(order, rdf_type, onto.Order.storid)
+            onto._add_data_triple_spod(order, onto.timestamp.storid, *to_literal(wall_time))
+            onto._add_obj_triple_spo(customer, onto.creates.storid, order)
+            touched.add(customer)
+        
+        # Drop owlready2's cached creates lists so they reload from the quadstore
+        for customer in touched:
+            entity = world._entities.get(customer)
+            if entity is not None:
+                entity.__dict__.pop("creates", None)
+        
+        exported = self.size - self.exported
+        self.exported = self.size
+        return exported
+
+# Persistent SQLite-backed quadstore for the bookstore ontology
+class OntologyStore:
+    def __init__(self, path, commit_interval=10, exclusive=True):
+        # A non-empty file is an existing store that the model resumes from
+        self.path = path
+        self.resumed = os.path.exists(path) and os.path.getsize(path) > 0
+        self.commit_interval = max(1, commit_interval)
+        self.commits = 0
+        self.world = World(filename=path, exclusive=exclusive)
+        self.onto = create_ontology(self.world)
+    
+    def load_state(self):
+        """Read the saved book and customer state, keyed by agent id"""
+        books = {}
+        for book in self.onto.Book.instances():
+            if book.hasId and book.availableQuantity and book.hasPrice:
+                sales = book.totalSales[0] if book.totalSales else 0
+                books[int(book.hasId[0])] = (book.availableQuantity[0], book.hasPrice[0], sales)
+        customers = {}
+        for customer in self.onto.Customer.instances():
+            if customer.hasId and customer.hasBudget:
+                # purchases holds each distinct book once, so the history is rebuilt
+                # from the Orders (one per sale, named order_<customer>_<book>_<time>)
+                orders = sorted((order.timestamp[0] if order.timestamp else 0.0, int(order.name.split("_")[2]))
+                                for order in customer.creates)
+                customers[int(customer.hasId[0])] = (customer.hasBudget[0],
+                                                     [book_id for _, book_id in orders], len(orders))
+        return books, customers
+    
+    def end_step(self, step):
+        """Commit the open transaction every commit_interval steps"""
+        if step % self.commit_interval == 0:
+            self.commit()
+    
+    def commit(self):
+        self.world.save()
+        self.commits += 1
+    
+    def close(self):
+        self.commit()
+        self.world.close()
+
+# Books whose stock is at or below their watch level, kept current on every stock change
+class LowStockWatchlist:
     def __init__(self):
-        self.messages = defaultdict(list)
-        self.subscribers = defaultdict(list)
+        self.books = {}  # book id -> book agent, for low-stock books only
+        self.level = 0  # highest employee restock threshold
     
-    def subscribe(self, topic, agent):
-        """Subscribe an agent to a topic"""
-        self.subscribers[topic].append(agent)
+    def __len__(self):
+        return len(self.books)
     
-    def publish(self, topic, message):
-        """Publish a message to a topic"""
-        self.messages[topic].append(message)
-        # Notify all subscribers
-        for agent in self.subscribers[topic]:
-            agent.receive_message(topic, message)
+    def __contains__(self, book):
+        return book.unique_id in self.books
+    
+    def watch_level(self, book):
+        # Watch books employees would restock as well as those requesting it
+        return max(book.restock_threshold, self.level)
+    
+    def update(self, book):
+        """Add or drop a book after its stock changed"""
+        if book.stock <= self.watch_level(book):
+            self.books[book.unique_id] = book
+        else:
+            self.books.pop(book.unique_id, None)
+    
+    def raise_level(self, level, books):
+        """Widen the watch level (e.g. for a new employee) and rescan the books once"""
+        if level > self.level:
+            self.level = level
+            for book in books:
+                self.update(book)
+    
+    def snapshot(self):
+        """The current low-stock books, safe to iterate while restocking"""
+        return list(self.books.values())
+
+# Collapses restock requests and assigns each book to exactly one employee
+class RestockCoordinator:
+    def __init__(self, model):
+        self.model = model
+        self.claimed = set()  # book ids restocked in the current step
+        self.requests = 0
+        self.duplicates_suppressed = 0
+        self.restocks = 0
+        
+        model.message_bus.subscribe("restock_needed", self)
+    
+    def begin_step(self):
+        self.claimed.clear()
+    
+    def owner(self, book_id):
+        """The employee responsible for a book (hash partition of book ids)"""
+        employees = self.model.employees
+        return employees[hash(book_id) % len(employees)] if employees else None
+    
+    def claim(self, book_id):
+        """Reserve a book for restocking this step; False if it already was"""
+        if book_id in self.claimed:
+            self.duplicates_suppressed += 1
+            return False
+        self.claimed.add(book_id)
+        self.restocks += 1
+        return True
+    
+    def request(self, book_id):
+        """Have the owning employee restock a book, at most once per step"""
+        self.requests += 1
+        book_agent = self.model.books.get(book_id)
+        employee = self.owner(book_id)
+        if book_agent is not None and employee is not None and self.claim(book_id):
+            employee.restock_book(book_agent)
+    
+    def receive_message(self, topic, message):
+        if topic == "restock_needed":
+            self.request(message.get("book_id"))
+    
+    def receive_batch(self, topic, messages):
+        for message in messages:
+            self.receive_message(topic, message)
+    
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "restocks": self.restocks,
+            "duplicates_suppressed": self.duplicates_suppressed
+        }
+
+# Per-event log for agent activity. "print" prints every event, "sampled"
+# emits every Nth event of each kind as a JSON line and "quiet" only counts
+class EventLog:
+    MODES = ("print", "sampled", "quiet")
+    
+    def __init__(self, mode="print", sample_every=100):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown log mode: {mode}")
+        self.mode = mode
+        self.sample_every = sample_every
+        self.counts = defaultdict(int)
     
-    def get_messages(self, topic):
-        """Get all messages for a topic"""
-        return self.messages[topic]
+    def log(self, kind, message, **fields):
+        """Record one event; message is a format string over fields"""
+        self.counts[kind] += 1
+        if self.mode == "print":
+            print(message.format(**fields))
+        elif self.mode == "sampled" and (self.counts[kind] - 1) % self.sample_every == 0:
+            print(json.dumps({"event": kind, "count": self.counts[kind], **fields}))
+    
+    def summary(self):
+        return dict(self.counts)
 
-# Create global message bus
-message_bus = MessageBus()
+# Wall-clock timers for each model step and the phases inside it, with
+# optional cProfile capture of a range of steps
+class StepProfiler:
+    def __init__(self, history=1000):
+        self.steps = 0
+        self.step_times = deque(maxlen=history)  # seconds, most recent steps
+        self.total_time = 0.0
+        self.phase_totals = defaultdict(float)
+        self.last_phases = {}
+        self.profile_range = None
+        self.profile = None
+        self.profiling = False
+    
+    def profile_steps(self, start, stop):
+        """Capture a cProfile of steps start <= step < stop"""
+        self.profile_range = (start, stop)
+    
+    def begin_step(self):
+        if self.profile_range and self.profile_range[0] <= self.steps < self.profile_range[1]:
+            if self.profile is None:
+                self.profile = cProfile.Profile()
+            self.profile.enable()
+            self.profiling = True
+        self.last_phases = {}
+        self.step_start = self.lap_start = time.perf_counter()
+    
+    def lap(self, phase):
+        """Charge the time since the previous lap to phase"""
+        now = time.perf_counter()
+        elapsed = now - self.lap_start
+        self.last_phases[phase] = self.last_phases.get(phase, 0.0) + elapsed
+        self.phase_totals[phase] += elapsed
+        self.lap_start = now
+    
+    def end_step(self):
+        elapsed = time.perf_counter() - self.step_start
+        if self.profiling:
+            self.profile.disable()
+            self.profiling = False
+        self.step_times.append(elapsed)
+        self.total_time += elapsed
+        self.steps += 1
+    
+    def profile_stats(self, sort="cumulative"):
+        """Return the captured pstats.Stats, or None if nothing was profiled"""
+        if self.profile is None:
+            return None
+        return pstats.Stats(self.profile).sort_stats(sort)
+    
+    def report(self):
+        """Step and per-phase timings in milliseconds"""
+        mean = self.total_time / self.steps if self.steps else 0.0
+        return {
+            "steps": self.steps,
+            "last_step_ms": self.step_times[-1] * 1000 if self.step_times else 0.0,
+            "mean_step_ms": mean * 1000,
+            "max_step_ms": max(self.step_times) * 1000 if self.step_times else 0.0,
+            "steps_per_second": 1 / mean if mean else 0.0,
+            "phases": {
+                phase: {
+                    "last_ms": self.last_phases.get(phase, 0.0) * 1000,
+                    "mean_ms": total / self.steps * 1000 if self.steps else 0.0,
+                    "share": total / self.total_time if self.total_time else 0.0
+                }
+                for phase, total in self.phase_totals.items()
+            }
+        }
 
 # Customer Agent
 class CustomerAgent(Agent):
     def __init__(self, unique_id, model, budget=100.0, preferred_genres=None):
         super().__init__(unique_id, model)
+        self.rng = model.streams.python("agent", unique_id)
         self.budget = budget
         self.preferred_genres = preferred_genres or ["Fiction", "Science"]
         self.purchased_books = []
         self.satisfaction = 0.5
         
         # Create ontology individual
-        self.onto_customer = Customer(f"customer_{unique_id}")
-        self.onto_customer.hasId = [str(unique_id)]
-        self.onto_customer.hasName = [f"Customer_{unique_id}"]
-        self.onto_customer.hasBudget = [budget]
+        self.onto_storid = model.create_individual("Customer", f"customer_{unique_id}",
+                                                   hasId=str(unique_id), hasName=f"Customer_{unique_id}",
+                                                   hasBudget=budget)
         
         # Subscribe to relevant topics
-        message_bus.subscribe("book_available", self)
-        message_bus.subscribe("price_update", self)
+        model.message_bus.subscribe("book_available", self)
+        model.message_bus.subscribe("price_update", self)
+    
+    @property
+    def onto_customer(self):
+        # Loaded from the quadstore on first use
+        return self.model.world._get_by_storid(self.onto_storid)
     
     def step(self):
         #Customer behavior: browse and potentially purchase books
-        if self.budget > 10 and random.random() < 0.3:  # 30% chance to browse
+        if self.budget > 10 and self.rng.random() < 0.3:  # 30% chance to browse
             self.browse_and_purchase()
     
     def browse_and_purchase(self):
         #Browse available books and make purchase decision
-        available_books = [agent for agent in self.model.schedule.agents 
-                          if isinstance(agent, BookAgent) and agent.stock > 0]
+        # Select an in-stock book from the preferred genres
+        book = self.model.catalog.sample(self.preferred_genres, rng=self.rng)
         
-        if not available_books:
-            return
+        if book is None:
+            book = self.model.catalog.sample(rng=self.rng)  # Fallback to any available book
         
-        # Filter by preferred genres
-        preferred_books = [book for book in available_books 
-                          if book.genre in self.preferred_genres]
-        
-        if not preferred_books:
-            preferred_books = available_books  # Fallback to any available book
-        
-        # Select a book to potentially purchase
-        book = random.choice(preferred_books)
+        if book is None:
+            return
         
         if book.price <= self.budget:
             self.purchase_book(book)
@@ -171,81 +914,89 @@ class CustomerAgent(Agent):
         # Purchase a book from a book agent
         if book_agent.stock > 0 and book_agent.price <= self.budget:
             # Update budget and records
+            old_budget, old_satisfaction = self.budget, self.satisfaction
             self.budget -= book_agent.price
             self.purchased_books.append(book_agent.unique_id)
             self.satisfaction = min(1.0, self.satisfaction + 0.1)
+            self.model.customer_changed(old_budget, old_satisfaction, self)
             
             # Update book stock
             book_agent.stock -= 1
             book_agent.total_sales += 1
+            self.model.total_sales += 1
             
-            # Update ontology
-            self.onto_customer.purchases.append(book_agent.onto_book)
-            book_agent.onto_book.availableQuantity = [book_agent.stock]
-            
-            # Create order in ontology
-            order = Order(f"order_{self.unique_id}_{book_agent.unique_id}_{time.time()}")
-            order.timestamp = [time.time()]
-            self.onto_customer.creates.append(order)
+            # Log the order and record the purchase for the next ontology flush
+            self.model.order_ledger.append(self.unique_id, book_agent.unique_id,
+                                           book_agent.price, self.model.schedule.steps)
+            self.model.ontology_sync.record_purchase(self, book_agent)
             
             # Publish purchase message
-            message_bus.publish("book_purchased", {
+            self.model.message_bus.publish("book_purchased", {
                 "customer_id": self.unique_id,
                 "book_id": book_agent.unique_id,
                 "price": book_agent.price,
                 "remaining_stock": book_agent.stock
             })
             
-            print(f"Customer {self.unique_id} purchased {book_agent.title} for ${book_agent.price:.2f}")
+            self.model.event_log.log("purchase", "Customer {customer_id} purchased {title} for ${price:.2f}",
+                                     step=self.model.schedule.steps, customer_id=self.unique_id,
+                                     title=book_agent.title, price=book_agent.price)
     
     def receive_message(self, topic, message):
         # Handle received messages
         if topic == "book_available":
             # React to new book availability
-            if random.random() < 0.2:  # 20% chance to be interested
+            if self.rng.random() < 0.2:  # 20% chance to be interested
                 self.browse_and_purchase()
+    
+    def receive_batch(self, topic, messages):
+        # Handle a batch of queued messages: react once to new availability
+        if topic == "book_available":
+            self.receive_message(topic, messages[-1])
 
 # Employee Agent
 class EmployeeAgent(Agent):
     def __init__(self, unique_id, model, restock_threshold=5):
         super().__init__(unique_id, model)
+        self.rng = model.streams.python("agent", unique_id)
         self.restock_threshold = restock_threshold
         self.restocked_books = []
         
         # Create ontology individual
-        self.onto_employee = Employee(f"employee_{unique_id}")
-        self.onto_employee.hasId = [str(unique_id)]
-        self.onto_employee.hasName = [f"Employee_{unique_id}"]
+        self.onto_storid = model.create_individual("Employee", f"employee_{unique_id}",
+                                                   hasId=str(unique_id), hasName=f"Employee_{unique_id}")
         
-        # Subscribe to restock requests
-        message_bus.subscribe("restock_needed", self)
-        message_bus.subscribe("book_purchased", self)
+        # Restock requests reach employees through the model's RestockCoordinator
+        model.message_bus.subscribe("book_purchased", self)
+    
+    @property
+    def onto_employee(self):
+        # Loaded from the quadstore on first use
+        return self.model.world._get_by_storid(self.onto_storid)
     
     def step(self):
         # Employee behavior: check inventory and restock if needed
         self.check_and_restock()
     
     def check_and_restock(self):
-        # Check all books and restock those with low inventory
-        book_agents = [agent for agent in self.model.schedule.agents 
-                      if isinstance(agent, BookAgent)]
-        
-        for book in book_agents:
-            if book.stock <= self.restock_threshold and random.random() < 0.7:
+        # Check the low-stock books assigned to this employee and restock them
+        coordinator = self.model.restock_coordinator
+        for book in self.model.low_stock.snapshot():
+            if coordinator.owner(book.unique_id) is not self:
+                continue
+            if (book.stock <= self.restock_threshold and self.rng.random() < 0.7
+                    and coordinator.claim(book.unique_id)):
                 self.restock_book(book)
     
     def restock_book(self, book_agent):
         # Restock a specific book
-        restock_amount = random.randint(10, 20)
+        restock_amount = self.rng.randint(10, 20)
         old_stock = book_agent.stock
         book_agent.stock += restock_amount
         self.restocked_books.append(book_agent.unique_id)
         
-        # Update ontology
-        book_agent.onto_book.availableQuantity = [book_agent.stock]
-        
         # Publish restock message
-        message_bus.publish("book_restocked", {
+        self.model.message_bus.publish("book_restocked", {
             "employee_id": self.unique_id,
             "book_id": book_agent.unique_id,
             "old_stock": old_stock,
@@ -253,57 +1004,64 @@ class EmployeeAgent(Agent):
             "restocked_amount": restock_amount
         })
         
-        print(f"Employee {self.unique_id} restocked {book_agent.title}: {old_stock} -> {book_agent.stock}")
+        self.model.event_log.log("restock", "Employee {employee_id} restocked {title}: {old_stock} -> {new_stock}",
+                                 step=self.model.schedule.steps, employee_id=self.unique_id,
+                                 title=book_agent.title, old_stock=old_stock, new_stock=book_agent.stock)
     
     def receive_message(self, topic, message):
-        # Handle received messages
-        if topic == "restock_needed":
-            book_id = message.get("book_id")
-            book_agents = [agent for agent in self.model.schedule.agents 
-                          if isinstance(agent, BookAgent) and agent.unique_id == book_id]
-            if book_agents:
-                self.restock_book(book_agents[0])
+        # Handle received messages (purchases need no action from employees)
+        pass
 
 # Book Agent
 class BookAgent(Agent):
     def __init__(self, unique_id, model, title, author, genre, price, initial_stock=15):
         super().__init__(unique_id, model)
+        self.rng = model.streams.python("agent", unique_id)
         self.title = title
         self.author = author
         self.genre = genre
         self.price = price
-        self.stock = initial_stock
+        self._stock = initial_stock
         self.total_sales = 0
         self.restock_threshold = 5
         
         # Create ontology individuals
-        self.onto_book = Book(f"book_{unique_id}")
-        self.onto_book.hasId = [str(unique_id)]
-        self.onto_book.hasName = [title]
-        self.onto_book.hasPrice = [price]
-        self.onto_book.availableQuantity = [initial_stock]
-        self.onto_book.restockThreshold = [self.restock_threshold]
-        
-        # Create author and genre individuals if they don't exist
-        author_individual = Author(f"author_{author.replace(' ', '_')}")
-        author_individual.hasName = [author]
-        self.onto_book.hasAuthor = [author_individual]
-        
-        genre_individual = Genre(f"genre_{genre}")
-        genre_individual.hasName = [genre]
-        self.onto_book.hasGenre = [genre_individual]
+        # Author and genre individuals are created once per model and shared
+        self.onto_storid = model.create_individual("Book", f"book_{unique_id}",
+                                                   hasId=str(unique_id), hasName=title, hasPrice=price,
+                                                   availableQuantity=initial_stock,
+                                                   restockThreshold=self.restock_threshold,
+                                                   totalSales=0,
+                                                   hasAuthor=model.author_individual(author),
+                                                   hasGenre=model.genre_individual(genre))
+    
+    @property
+    def onto_book(self):
+        # Loaded from the quadstore on first use
+        return self.model.world._get_by_storid(self.onto_storid)
+    
+    @property
+    def stock(self):
+        return self._stock
+    
+    @stock.setter
+    def stock(self, value):
+        # Keep the model's in-stock registry in sync with stock changes
+        old_stock = self._stock
+        self._stock = value
+        self.model.book_stock_changed(self, old_stock)
     
     def step(self):
         # Book behavior: monitor stock and request restock if needed
         if self.stock <= self.restock_threshold:
-            message_bus.publish("restock_needed", {
+            self.model.message_bus.publish("restock_needed", {
                 "book_id": self.unique_id,
                 "current_stock": self.stock,
                 "threshold": self.restock_threshold
             })
         
         # Occasionally adjust price based on demand
-        if random.random() < 0.1:  # 10% chance
+        if self.rng.random() < 0.1:  # 10% chance
             self.adjust_price()
     
     def adjust_price(self):
@@ -313,120 +1071,668 @@ class BookAgent(Agent):
         elif self.total_sales == 0 and self.stock > 10:  # Low demand
             self.price *= 0.95  # Decrease price by 5%
         
-        # Update ontology
-        self.onto_book.hasPrice = [self.price]
+        self.model.catalog.update_price(self)
+        self.model.ontology_sync.record_price(self)
         
         # Publish price update
-        message_bus.publish("price_update", {
+        self.model.message_bus.publish("price_update", {
             "book_id": self.unique_id,
             "new_price": self.price
         })
 
+# Book catalog and customer genres used to populate the store
+BOOK_DATA = [
+    ("Python Programming", "John Smith", "Technology", 29.99),
+    ("Data Science Handbook", "Jane Doe", "Technology", 39.99),
+    ("Mystery Novel", "Alice Brown", "Fiction", 14.99),
+    ("Science Fiction Epic", "Bob Wilson", "Science Fiction", 24.99),
+    ("History of AI", "Carol Davis", "Technology", 34.99),
+    ("Romance Story", "David Miller", "Romance", 12.99),
+    ("Thriller Adventure", "Eve Johnson", "Thriller", 19.99),
+    ("Fantasy Quest", "Frank Anderson", "Fantasy", 22.99),
+    ("Biography", "Grace Taylor", "Biography", 18.99),
+    ("Self Help Guide", "Henry White", "Self Help", 16.99),
+    ("Cooking Recipes", "Ivy Green", "Cooking", 21.99),
+    ("Travel Guide", "Jack Blue", "Travel", 25.99),
+    ("Art History", "Kate Red", "Art", 32.99),
+    ("Music Theory", "Leo Orange", "Music", 28.99),
+    ("Philosophy Basics", "Mia Purple", "Philosophy", 26.99)
+]
+
+CUSTOMER_GENRES = ["Technology", "Fiction", "Science Fiction", "Romance", "Thriller", "Fantasy"]
+
+# Compensated (Neumaier) running sum, so incremental updates stay as accurate
+# as summing all values from scratch
+class RunningSum:
+    def __init__(self, values=()):
+        self.total = 0.0
+        self.compensation = 0.0
+        for value in values:
+            self.add(value)
+    
+    def add(self, value):
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+    
+    @property
+    def value(self):
+        return self.total + self.compensation
+
+# Independent random streams derived from one model seed. Streams are keyed
+# (e.g. ("agent", 12) or "setup") instead of handed out in creation order, so
+# a run's draws don't depend on what else was created or on the process
+class RandomStreams:
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(128)  # follows random.seed() when unseeded
+        self.seed = seed
+        self.roots = {}  # stream name -> derived 128-bit root seed
+    
+    def sequence(self, *key):
+        spawn_key = tuple(zlib.crc32(part.encode()) if isinstance(part, str) else part
+                          for part in key)
+        return np.random.SeedSequence(self.seed, spawn_key=spawn_key)
+    
+    def python(self, name, *ids):
+        """Return a random.Random stream for one agent or subsystem"""
+        # Streams of one kind (e.g. every agent) share a derived root and differ
+        # in the trailing words of the seed, so creating 100k agents doesn't
+        # cost a SeedSequence each
+        root = self.roots.get(name)
+        if root is None:
+            root = self.roots[name] = int.from_bytes(self.sequence(name).generate_state(4).tobytes(), "little")
+        for part in ids:
+            root = (root << 64) | part
+        return random.Random(root)
+    
+    def numpy(self, *key):
+        """Return a NumPy Generator stream for bulk (vectorized) draws"""
+        return np.random.default_rng(self.sequence(*key))
+
+# Preallocated, growable NumPy columns of the statistics collected each step
+class MetricsStore:
+    def __init__(self, model_reporters, capacity=256):
+        self.model_reporters = model_reporters
+        self.capacity = capacity
+        self.columns = {}  # created on the first collect, typed by the first values
+        self.size = 0
+    
+    def __len__(self):
+        return self.size
+    
+    def collect(self, model):
+        """Evaluate every reporter and append the values as a new row"""
+        values = {name: reporter(model) for name, reporter in self.model_reporters.items()}
+        if not self.columns:
+            self.columns = {name: np.empty(self.capacity, dtype=np.int64 if isinstance(value, (int, np.integer))
+                                           else np.float64)
+                            for name, value in values.items()}
+        elif self.size == self.capacity:
+            # Grow by doubling, so appends stay amortized O(1)
+            self.capacity *= 2
+            for name, column in self.columns.items():
+                grown = np.empty(self.capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+        for name, value in values.items():
+            self.columns[name][self.size] = value
+        self.size += 1
+    
+    def latest(self):
+        """The most recent row as a dict, or None before the first collect"""
+        if not self.size:
+            return None
+        return {name: column[self.size - 1].item() for name, column in self.columns.items()}
+    
+    def window(self, name, length=None):
+        """Zero-copy view of a column's last `length` values (all if None)"""
+        if name not in self.columns:
+            return np.empty(0)
+        start = 0 if length is None else max(0, self.size - length)
+        return self.columns[name][start:self.size]
+    
+    def get_model_vars_dataframe(self):
+        """Build a pandas DataFrame of everything collected so far"""
+        import pandas as pd
+        return pd.DataFrame({name: column[:self.size].copy() for name, column in self.columns.items()},
+                            columns=list(self.model_reporters))
+
+# Model reporters for the agent engine; each is O(1)
+MODEL_REPORTERS = {
+    "Total Books": lambda m: len(m.books),
+    "Total Stock": lambda m: m.total_stock,
+    "Total Sales": lambda m: m.total_sales,
+    "Average Customer Budget": lambda m: m.mean_budget(),
+    "Customer Satisfaction": lambda m: m.mean_satisfaction()
+}
+
+# Read-only views of a model for another thread, such as the GUI's
+class ModelSnapshot:
+    """One step's statistics, inventory rows and customer rows, in arrays.
+    
+    Titles, authors and genres don't change during a run, so they are read
+    once; the numeric columns are refilled in place by SnapshotBuffer.
+    """
+    def __init__(self, model):
+        books = list(model.books.values())
+        self.book_ids = np.array([book.unique_id for book in books], dtype=np.int64)
+        self.book_titles = tuple(book.title for book in books)
+        self.book_authors = tuple(book.author for book in books)
+        self.book_genres = tuple(book.genre for book in books)
+        self.book_prices = np.zeros(len(books))
+        self.book_stock = np.zeros(len(books), dtype=np.int64)
+        self.book_sales = np.zeros(len(books), dtype=np.int64)
+        
+        customers = model.customers
+        self.customer_ids = np.array([customer.unique_id for customer in customers], dtype=np.int64)
+        self.customer_genres = tuple(', '.join(customer.preferred_genres) for customer in customers)
+        self.customer_budgets = np.zeros(len(customers))
+        self.customer_purchases = np.zeros(len(customers), dtype=np.int64)
+        self.customer_satisfaction = np.zeros(len(customers))
+        
+        self.stat_names = tuple(model.datacollector.model_reporters)
+        self.stat_values = np.zeros(len(self.stat_names))
+        self.has_stats = False
+        self.history_steps = np.empty(0, dtype=np.int64)  # statistics rows since the previous snapshot
+        self.history = np.empty((0, len(self.stat_names)))
+        
+        self.step = 0
+        self.time = 0.0
+        self.instrumentation = None
+        self.messages = []  # (topic, message) published since the previous snapshot
+        self.next_row = 0  # statistics rows and message cursors the next snapshot starts from
+        self.bus_cursors = {}
+        self.ontology = None  # model.ontology_view(), when one was requested
+    
+    @property
+    def stats(self):
+        """The latest collected statistics as a dict, or None before the first collect"""
+        if not self.has_stats:
+            return None
+        return dict(zip(self.stat_names, self.stat_values.tolist()))
+    
+    def fill(self, model, first_row):
+        """Copy the model's current state, and its statistics rows from first_row on"""
+        books = model.books.values()
+        self.book_prices[:] = [book.price for book in books]
+        self.book_stock[:] = [book.stock for book in books]
+        self.book_sales[:] = [book.total_sales for book in books]
+        
+        customers = model.customers
+        self.customer_budgets[:] = [customer.budget for customer in customers]
+        self.customer_purchases[:] = [len(customer.purchased_books) for customer in customers]
+        self.customer_satisfaction[:] = [customer.satisfaction for customer in customers]
+        
+        store = model.datacollector
+        self.has_stats = len(store) > 0
+        if self.has_stats:
+            self.stat_values[:] = [store.columns[name][len(store) - 1] for name in self.stat_names]
+            self.history_steps = np.arange(first_row, len(store))
+            self.history = np.column_stack([store.columns[name][first_row:len(store)]
+                                            for name in self.stat_names]).astype(float)
+        
+        self.step = model.profiler.steps
+        self.time = time.perf_counter()
+        self.instrumentation = model.instrumentation()
+
+class SnapshotBuffer:
+    """Double-buffered ModelSnapshots handed from the stepping thread to one reader.
+    
+    publish() fills the buffer the reader isn't using and makes it the
+    front. If the reader never took the previous front, that buffer is
+    withdrawn and refilled with the newer state, and the statistics rows and
+    messages it carried are carried over. The reader may use a snapshot until
+    its next take(), because the writer only ever fills the other buffer.
+    """
+    def __init__(self, model, message_limit=100):
+        self.buffers = [ModelSnapshot(model), ModelSnapshot(model)]
+        self.front = None  # index of the newest snapshot
+        self.taken = True  # whether the reader has taken the front snapshot
+        self.lock = threading.Lock()
+        self.message_limit = message_limit  # newest messages per topic and snapshot
+        self.next_row = 0  # first statistics row the reader hasn't taken
+        self.bus_cursors = {}  # topic -> first message bus sequence the reader hasn't taken
+        self.ontology_requested = False
+        self.published = 0
+        self.coalesced = 0  # snapshots replaced before the reader took them
+    
+    def request_ontology(self):
+        """Attach model.ontology_view() to the next snapshot"""
+        self.ontology_requested = True
+    
+    def publish(self, model):
+        """Snapshot the model after a step"""
+        with self.lock:
+            if self.taken:
+                index = 1 if self.front == 0 else 0
+            else:
+                index = self.front
+                self.taken = True  # withdrawn while it is refilled
+                self.coalesced += 1
+            first_row, cursors = self.next_row, dict(self.bus_cursors)
+        
+        snapshot = self.buffers[index]
+        withdrawn_ontology = snapshot.ontology if index == self.front else None
+        snapshot.fill(model, first_row)
+        snapshot.next_row = len(model.datacollector)
+        
+        message_bus = model.message_bus
+        snapshot.messages = []
+        for topic, buffer in list(message_bus.messages.items()):
+            # Only the newest message_limit messages are handed over, so the
+            # reader never falls behind a busy topic
+            cursor = max(cursors.get(topic, buffer.first), buffer.total - self.message_limit)
+            messages, cursors[topic] = message_bus.read_messages(topic, cursor, self.message_limit)
+            snapshot.messages.extend((topic, message) for message in messages)
+        snapshot.bus_cursors = cursors
+        
+        snapshot.ontology = withdrawn_ontology
+        if self.ontology_requested:
+            self.ontology_requested = False
+            snapshot.ontology = model.ontology_view()
+        
+        with self.lock:
+            self.front = index
+            self.taken = False
+        self.published += 1
+    
+    def take(self):
+        """Return the newest snapshot if the reader hasn't taken it yet, else None"""
+        with self.lock:
+            if self.taken:
+                return None
+            self.taken = True
+            snapshot = self.buffers[self.front]
+            self.next_row, self.bus_cursors = snapshot.next_row, snapshot.bus_cursors
+            return snapshot
+
 # Bookstore Model
 class BookstoreModel(Model):
-    def __init__(self, num_customers=10, num_employees=2, num_books=15):
+    def __init__(self, num_customers=10, num_employees=2, num_books=15, engine="agent",
+                 ontology_mode="step", ontology_interval=1,
+                 ontology_path=None, commit_interval=10, message_mode="sync", seed=None,
+                 log_mode="print", log_every=100, profile_steps=None, snapshots=False):
         self.num_customers = num_customers
         self.num_employees = num_employees
         self.num_books = num_books
+        # Every random draw comes from a stream derived from the seed, so runs
+        # with the same seed collect identical data in any process
+        self.streams = RandomStreams(seed)
+        self.random = self.streams.python("schedule")
         self.schedule = RandomActivation(self)
+        self.event_log = EventLog(log_mode, log_every)
+        self.profiler = StepProfiler()
+        if profile_steps:
+            self.profiler.profile_steps(*profile_steps)
+        
+        # Each model owns its message bus: "sync" delivers messages as they are
+        # published, "batched" queues them per topic and delivers them after
+        # all agents have stepped
+        self.message_bus = MessageBus(message_mode)
+        
+        # Per-type agent registries, so agents and reporters never have to
+        # scan the whole schedule with isinstance
+        self.books = {}
+        self.customers = []
+        self.employees = []
+        self.catalog = BookCatalog()
+        self.restock_coordinator = RestockCoordinator(self)
+        self.low_stock = LowStockWatchlist()
+        
+        # Running aggregates kept current by the mutation points, so that
+        # collecting statistics each step is O(1)
+        self.total_stock = 0
+        self.total_sales = 0
+        self.budget_sum = RunningSum()
+        self.satisfaction_sum = RunningSum()
+        
+        # Each model owns its owlready2 world, in memory or backed by an
+        # on-disk SQLite quadstore
+        self.ontology_store = OntologyStore(ontology_path, commit_interval) if ontology_path else None
+        if self.ontology_store:
+            self.world, self.onto = self.ontology_store.world, self.ontology_store.onto
+        else:
+            self.world = World()
+            self.onto = create_ontology(self.world)
+        
+        # Ontology writes are buffered during a step and flushed in batches:
+        # "off" drops them, "step" flushes every step, "interval" every N steps
+        self.ontology_sync = OntologySync(self.onto, ontology_mode, ontology_interval)
+        
+        self.onto_authors = {}  # name -> storid
+        self.onto_genres = {}  # name -> storid
+        self.ontology_builder = None
+        
+        # Orders go to a columnar ledger and reach the ontology only on demand
+        self.order_ledger = OrderLedger()
+        
+        # The built-in books, padded with generated ones for larger catalogs
+        book_data = generate_catalog(num_books, self.streams.numpy("catalog"), BOOK_DATA)
+        
+        if engine == "vectorized":
+            # Struct-of-arrays engine: no per-agent objects or ontology individuals
+            self.engine = VectorizedEngine(book_data, num_customers, num_employees,
+                                           CUSTOMER_GENRES,
+                                           self.streams.numpy("vectorized"),
+                                           ledger=self.order_ledger,
+                                           customer_id_offset=num_books)
+            self.datacollector = MetricsStore(self.engine.model_reporters())
+            self.snapshots = SnapshotBuffer(self) if snapshots else None
+            return
+        if engine != "agent":
+            raise ValueError(f"Unknown engine: {engine}")
+        self.engine = None
         
-        # Create book data
-        book_data = [
-            ("Python Programming", "John Smith", "Technology", 29.99),
-            ("Data Science Handbook", "Jane Doe", "Technology", 39.99),
-            ("Mystery Novel", "Alice Brown", "Fiction", 14.99),
-            ("Science Fiction Epic", "Bob Wilson", "Science Fiction", 24.99),
-            ("History of AI", "Carol Davis", "Technology", 34.99),
-            ("Romance Story", "David Miller", "Romance", 12.99),
-            ("Thriller Adventure", "Eve Johnson", "Thriller", 19.99),
-            ("Fantasy Quest", "Frank Anderson", "Fantasy", 22.99),
-            ("Biography", "Grace Taylor", "Biography", 18.99),
-            ("Self Help Guide", "Henry White", "Self Help", 16.99),
-            ("Cooking Recipes", "Ivy Green", "Cooking", 21.99),
-            ("Travel Guide", "Jack Blue", "Travel", 25.99),
-            ("Art History", "Kate Red", "Art", 32.99),
-            ("Music Theory", "Leo Orange", "Music", 28.99),
-            ("Philosophy Basics", "Mia Purple", "Philosophy", 26.99)
-        ]
+        # Read the saved state before the agent constructors overwrite it
+        saved_state = None
+        if self.ontology_store and self.ontology_store.resumed:
+            saved_state = self.ontology_store.load_state()
+        
+        # Queue every individual and write them all in one transaction; only a
+        # resumed store can already hold some of them
+        resumed = self.ontology_store is not None and self.ontology_store.resumed
+        self.ontology_builder = OntologyBuilder(self.onto, reuse_existing=resumed)
         
         # Create book agents
-        for i in range(min(num_books, len(book_data))):
-            title, author, genre, price = book_data[i]
+        for i, (title, author, genre, price) in enumerate(book_data):
             book = BookAgent(i, self, title, author, genre, price)
-            self.schedule.add(book)
+            self.add_agent(book)
         
         # Create customer agents
-        genres = ["Technology", "Fiction", "Science Fiction", "Romance", "Thriller", "Fantasy"]
+        setup_rng = self.streams.python("setup")
         for i in range(num_customers):
             customer_id = num_books + i
-            budget = random.uniform(50, 200)
-            preferred_genres = random.sample(genres, random.randint(1, 3))
+            budget = setup_rng.uniform(50, 200)
+            preferred_genres = setup_rng.sample(CUSTOMER_GENRES, setup_rng.randint(1, 3))
             customer = CustomerAgent(customer_id, self, budget, preferred_genres)
-            self.schedule.add(customer)
+            self.add_agent(customer)
         
         # Create employee agents
         for i in range(num_employees):
             employee_id = num_books + num_customers + i
             employee = EmployeeAgent(employee_id, self)
-            self.schedule.add(employee)
-        
-        # Data collector for statistics
-        self.datacollector = DataCollector(
-            model_reporters={
-                "Total Books": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, BookAgent)),
-                "Total Stock": lambda m: sum(a.stock for a in m.schedule.agents if isinstance(a, BookAgent)),
-                "Total Sales": lambda m: sum(a.total_sales for a in m.schedule.agents if isinstance(a, BookAgent)),
-                "Average Customer Budget": lambda m: np.mean([a.budget for a in m.schedule.agents if isinstance(a, CustomerAgent)]),
-                "Customer Satisfaction": lambda m: np.mean([a.satisfaction for a in m.schedule.agents if isinstance(a, CustomerAgent)])
+            self.add_agent(employee)
+        
+        self.ontology_builder.commit()
+        self.ontology_builder = None
+        
+        # Pick up where a previous run against the same store left off
+        if saved_state is not None:
+            self.restore_state(*saved_state)
+        
+        # Statistics collected each step, read from the running aggregates
+        self.datacollector = MetricsStore(MODEL_REPORTERS)
+        
+        # Read-only snapshots published after each step for another thread
+        self.snapshots = SnapshotBuffer(self) if snapshots else None
+    
+    def create_individual(self, class_name, name, **properties):
+        """Create an ontology individual and return its storid.
+        
+        During construction individuals are queued on the bulk builder;
+        afterwards each one is written straight away.
+        """
+        if self.ontology_builder is not None:
+            return self.ontology_builder.individual(class_name, name, **properties)
+        builder = OntologyBuilder(self.onto)
+        storid = builder.individual(class_name, name, **properties)
+        builder.commit()
+        return storid
+    
+    def author_individual(self, name):
+        """Return the storid of the ontology Author named name, creating it on first use"""
+        storid = self.onto_authors.get(name)
+        if storid is None:
+            storid = self.onto_authors[name] = self.create_individual(
+                "Author", f"author_{name.replace(' ', '_')}", hasName=name)
+        return storid
+    
+    def genre_individual(self, name):
+        """Return the storid of the ontology Genre named name, creating it on first use"""
+        storid = self.onto_genres.get(name)
+        if storid is None:
+            storid = self.onto_genres[name] = self.create_individual(
+                "Genre", f"genre_{name}", hasName=name)
+        return storid
+    
+    def add_agent(self, agent):
+        """Add an agent to the schedule and to its type registry"""
+        self.schedule.add(agent)
+        if isinstance(agent, BookAgent):
+            self.books[agent.unique_id] = agent
+            if agent.stock > 0:
+                self.catalog.add(agent)
+            self.low_stock.update(agent)
+            self.total_stock += agent.stock
+            self.total_sales += agent.total_sales
+        elif isinstance(agent, CustomerAgent):
+            self.customers.append(agent)
+            self.budget_sum.add(agent.budget)
+            self.satisfaction_sum.add(agent.satisfaction)
+        elif isinstance(agent, EmployeeAgent):
+            self.employees.append(agent)
+            self.low_stock.raise_level(agent.restock_threshold, self.books.values())
+    
+    def book_stock_changed(self, book, old_stock):
+        """Update the catalog, low-stock watchlist and ontology buffer when a book's stock changes"""
+        if book.unique_id not in self.books:
+            return
+        self.total_stock += book.stock - old_stock
+        self.ontology_sync.record_stock(book)
+        self.low_stock.update(book)
+        if book.stock > 0:
+            self.catalog.add(book)
+        else:
+            self.catalog.remove(book)
+    
+    def customer_changed(self, old_budget, old_satisfaction, customer):
+        """Update the budget and satisfaction aggregates after a purchase"""
+        self.budget_sum.add(customer.budget)
+        self.budget_sum.add(-old_budget)
+        self.satisfaction_sum.add(customer.satisfaction)
+        self.satisfaction_sum.add(-old_satisfaction)
+    
+    def recompute_aggregates(self):
+        """Rebuild the running aggregates from the agents with a full pass"""
+        self.total_stock = sum(book.stock for book in self.books.values())
+        self.total_sales = sum(book.total_sales for book in self.books.values())
+        self.budget_sum = RunningSum(customer.budget for customer in self.customers)
+        self.satisfaction_sum = RunningSum(customer.satisfaction for customer in self.customers)
+    
+    def mean_budget(self):
+        return self.budget_sum.value / len(self.customers) if self.customers else float("nan")
+    
+    def mean_satisfaction(self):
+        return self.satisfaction_sum.value / len(self.customers) if self.customers else float("nan")
+    
+    def restore_state(self, saved_books, saved_customers):
+        """Restore book and customer state loaded from a resumed ontology store"""
+        for customer in self.customers:
+            if customer.unique_id in saved_customers:
+                customer.budget, customer.purchased_books, orders = saved_customers[customer.unique_id]
+                customer.satisfaction = min(1.0, 0.5 + 0.1 * orders)
+                customer.onto_customer.hasBudget = [customer.budget]
+        
+        for book_id, book in self.books.items():
+            if book_id in saved_books:
+                stock, book.price, book.total_sales = saved_books[book_id]
+                self.catalog.update_price(book)
+                book.stock = stock
+                book.onto_book.availableQuantity = [book.stock]
+                book.onto_book.hasPrice = [book.price]
+                book.onto_book.totalSales = [book.total_sales]
+        
+        self.recompute_aggregates()
+    
+    def sync_ontology(self):
+        """Apply buffered ontology writes and export pending orders as Order individuals"""
+        self.ontology_sync.flush()
+        # The vectorized engine has no Customer or Book individuals for orders to point at
+        if self.ontology_sync.enabled and self.engine is None:
+            self.order_ledger.export_to_ontology(self.onto)
+    
+    def ontology_view(self, max_books=1000, max_customers=12):
+        """Plain-data summary of the ontology for display.
+        
+        Lists up to max_books books, counts books and purchases per genre,
+        and samples the max_customers customers with the most purchases.
+        Syncs the ontology first, so call it from the thread that steps the
+        model, or while nothing is stepping it.
+        """
+        self.sync_ontology()
+        onto, graph = self.onto, self.world.graph
+        
+        def name(individual):
+            return individual.hasName[0] if individual.hasName else None
+        
+        books = [(name(book), book.hasPrice[0] if book.hasPrice else None,
+                  book.availableQuantity[0] if book.availableQuantity else None)
+                 for book in itertools.islice(onto.Book.instances(), max_books)]
+        
+        # Books and purchases per genre, counted in SQL rather than loaded
+        genre_names = {storid: genre for genre, storid in self.onto_genres.items()}
+        genres = {genre: {"books": 0, "purchases": 0} for genre in self.onto_genres}
+        for storid, count in graph.execute("SELECT o, COUNT(*) FROM objs WHERE p=? GROUP BY o",
+                                           (onto.hasGenre.storid,)):
+            if storid in genre_names:
+                genres[genre_names[storid]]["books"] = count
+        for storid, count in graph.execute(
+                "SELECT g.o, COUNT(*) FROM objs p JOIN objs g ON g.s=p.o AND g.p=? "
+                "WHERE p.p=? GROUP BY g.o", (onto.hasGenre.storid, onto.purchases.storid)):
+            if storid in genre_names:
+                genres[genre_names[storid]]["purchases"] = count
+        
+        # The most active customers, with each purchased book's genre
+        customers = []
+        for storid, _ in graph.execute(
+                "SELECT s, COUNT(*) AS n FROM objs WHERE p=? GROUP BY s ORDER BY n DESC, s LIMIT ?",
+                (onto.purchases.storid, max_customers)):
+            customer = self.world._get_by_storid(storid)
+            customers.append((name(customer), [(name(book), name(book.hasGenre[0]) if book.hasGenre else None)
+                                               for book in customer.purchases]))
+        
+        return {
+            "books": books,
+            "genres": genres,
+            "customers": customers,
+            "employees": [name(employee) for employee in onto.Employee.instances()],
+            "counts": {cls: len(self.world.search(type=onto[cls]))
+                       for cls in ("Book", "Customer", "Employee", "Order")}
+        }
+    
+    def close(self):
+        """Release the model's world and message bus, first saving an on-disk store"""
+        if self.ontology_store:
+            self.sync_ontology()
+            self.ontology_store.close()
+        else:
+            # Nothing outlives an in-memory world, so pending writes are dropped
+            self.world.close()
+        self.message_bus.subscribers.clear()
+        self.message_bus.queues.clear()
+    
+    def get_in_stock_books(self):
+        """Return the book agents that currently have stock, in id order"""
+        return self.catalog.books()
+    
+    def instrumentation(self):
+        """Step profile plus counters for messages, ontology writes, purchases and restocks"""
+        if self.engine is not None:
+            restocks = int(self.engine.restock_actions.sum())
+        else:
+            restocks = self.event_log.counts.get("restock", 0)
+        return {
+            "profile": self.profiler.report(),
+            "counters": {
+                "messages_published": dict(self.message_bus.published),
+                "messages_delivered": dict(self.message_bus.delivered),
+                "ontology_mutations": self.ontology_sync.mutations_applied,
+                "ontology_flushes": self.ontology_sync.flushes,
+                "purchases": len(self.order_ledger),
+                "restocks": restocks,
+                "orders_exported": self.order_ledger.exported
             }
-        )
+        }
     
     def step(self):
-        # Advance the model by one step
+        # Advance the model by one step, timing each phase
+        profiler = self.profiler
+        profiler.begin_step()
         self.datacollector.collect(self)
-        self.schedule.step()
+        profiler.lap("collect")
+        if self.engine is not None:
+            self.engine.step()
+            profiler.lap("engine")
+        else:
+            self.restock_coordinator.begin_step()
+            self.schedule.step()
+            profiler.lap("agents")  # includes delivery in "sync" message mode
+            self.message_bus.drain()
+            profiler.lap("messages")
+            self.ontology_sync.end_step()
+            if self.ontology_store:
+                self.ontology_store.end_step(self.schedule.steps)
+            profiler.lap("ontology")
+        profiler.end_step()
+        if self.snapshots:
+            self.snapshots.publish(self)
 
-def run_simulation():
+def run_simulation(num_customers=8, num_employees=2, num_books=12, steps=20, report_every=5,
+                   log_mode="print", **model_kwargs):
     # Run the bookstore simulation
-    print("Starting Bookstore Management System Simulation...")
-    print("=" * 60)
+    verbose = log_mode == "print"
+    if verbose:
+        print("Starting Bookstore Management System Simulation...")
+        print("=" * 60)
     
     # Create and run the model
-    model = BookstoreModel(num_customers=8, num_employees=2, num_books=12)
+    model = BookstoreModel(num_customers=num_customers, num_employees=num_employees,
+                           num_books=num_books, log_mode=log_mode, **model_kwargs)
     
-    print(f"Created bookstore with:")
-    print(f"- {model.num_books} books")
-    print(f"- {model.num_customers} customers") 
-    print(f"- {model.num_employees} employees")
-    print("\nStarting simulation...\n")
+    if verbose:
+        print(f"Created bookstore with:")
+        print(f"- {model.num_books} books")
+        print(f"- {model.num_customers} customers") 
+        print(f"- {model.num_employees} employees")
+        print("\nStarting simulation...\n")
     
-    # Run simulation for 20 steps
-    for step in range(20):
-        print(f"\n--- Step {step + 1} ---")
+    start = time.perf_counter()
+    for step in range(steps):
+        if verbose:
+            print(f"\n--- Step {step + 1} ---")
         model.step()
         
-        # Print some statistics every 5 steps
-        if (step + 1) % 5 == 0:
+        # Print some statistics every report_every steps
+        if verbose and report_every and (step + 1) % report_every == 0:
             print(f"\nStatistics after step {step + 1}:")
-            data = model.datacollector.get_model_vars_dataframe()
-            if not data.empty:
-                latest = data.iloc[-1]
+            latest = model.datacollector.latest()
+            if latest:
                 print(f"Total Stock: {latest['Total Stock']}")
                 print(f"Total Sales: {latest['Total Sales']}")
                 print(f"Average Customer Budget: ${latest['Average Customer Budget']:.2f}")
                 print(f"Customer Satisfaction: {latest['Customer Satisfaction']:.2f}")
+    model.elapsed = time.perf_counter() - start
+    model.datacollector.collect(model)
+    
+    # Apply buffered writes and export orders before the ontology is inspected
+    model.sync_ontology()
     
     return model
 
-def inspect_ontology():
+def inspect_ontology(model):
     # Inspect the ontology after simulation
+    onto = model.onto
     print("\n" + "=" * 60)
     print("ONTOLOGY INSPECTION")
     print("=" * 60)
     
     # Inspect Books
     print("\nBooks in ontology:")
-    for book in Book.instances():
+    for book in onto.Book.instances():
         print(f"- {book.hasName[0] if book.hasName else 'Unnamed'}")
         if book.hasPrice:
             print(f"  Price: ${book.hasPrice[0]:.2f}")
@@ -438,8 +1744,8 @@ def inspect_ontology():
             print(f"  Genre: {book.hasGenre[0].hasName[0] if book.hasGenre[0].hasName else 'Unknown'}")
     
     # Inspect Customers
-    print(f"\nCustomers in ontology: {len(list(Customer.instances()))}")
-    for customer in list(Customer.instances())[:3]:  # Show first 3
+    print(f"\nCustomers in ontology: {len(list(onto.Customer.instances()))}")
+    for customer in list(onto.Customer.instances())[:3]:  # Show first 3
         print(f"- {customer.hasName[0] if customer.hasName else 'Unnamed'}")
         if customer.hasBudget:
             print(f"  Budget: ${customer.hasBudget[0]:.2f}")
@@ -447,16 +1753,16 @@ def inspect_ontology():
             print(f"  Purchased books: {len(customer.purchases)}")
     
     # Inspect Employees
-    print(f"\nEmployees in ontology: {len(list(Employee.instances()))}")
+    print(f"\nEmployees in ontology: {len(list(onto.Employee.instances()))}")
     
     # Inspect Orders
-    print(f"\nOrders created: {len(list(Order.instances()))}")
+    print(f"\nOrders created: {len(list(onto.Order.instances()))}")
     
     # Summary statistics
-    total_books = len(list(Book.instances()))
-    total_customers = len(list(Customer.instances()))
-    total_employees = len(list(Employee.instances()))
-    total_orders = len(list(Order.instances()))
+    total_books = len(list(onto.Book.instances()))
+    total_customers = len(list(onto.Customer.instances()))
+    total_employees = len(list(onto.Employee.instances()))
+    total_orders = len(list(onto.Order.instances()))
     
     print(f"\nSUMMARY:")
     print(f"Total Books: {total_books}")
@@ -471,11 +1777,10 @@ def generate_report(model):
     print("=" * 60)
     
     # Get final statistics
-    data = model.datacollector.get_model_vars_dataframe()
+    latest = model.datacollector.latest()
     
-    if not data.empty:
+    if latest:
         print(f"\nFinal Statistics:")
-        latest = data.iloc[-1]
         print(f"Total Books Available: {latest['Total Books']}")
         print(f"Total Stock Remaining: {latest['Total Stock']}")
         print(f"Total Sales Made: {latest['Total Sales']}")
@@ -483,9 +1788,9 @@ def generate_report(model):
         print(f"Average Customer Satisfaction: {latest['Customer Satisfaction']:.2f}")
     
     # Agent-specific statistics
-    book_agents = [a for a in model.schedule.agents if isinstance(a, BookAgent)]
-    customer_agents = [a for a in model.schedule.agents if isinstance(a, CustomerAgent)]
-    employee_agents = [a for a in model.schedule.agents if isinstance(a, EmployeeAgent)]
+    book_agents = list(model.books.values())
+    customer_agents = model.customers
+    employee_agents = model.employees
     
     print(f"\nAgent Performance:")
     print(f"Most Popular Book: {max(book_agents, key=lambda x: x.total_sales).title}")
@@ -494,11 +1799,59 @@ def generate_report(model):
     print(f"Active Customers: {len([c for c in customer_agents if c.budget > 10])}")
     print(f"Total Restocking Actions: {sum(len(e.restocked_books) for e in employee_agents)}")
 
-if __name__ == "__main__":
-    # Run the complete simulation
-    try:
-        model = run_simulation()
-        inspect_ontology()
+def json_ready(value):
+    """Copy of value that json.dumps writes as valid JSON: NaN and infinities become null"""
+    if isinstance(value, dict):
+        return {key: json_ready(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_ready(item) for item in value]
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+    return value
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the bookstore simulation headless")
+    parser.add_argument("--customers", type=int, default=8)
+    parser.add_argument("--employees", type=int, default=2)
+    parser.add_argument("--books", type=int, default=12)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=("agent", "vectorized"), default="agent")
+    parser.add_argument("--message-mode", choices=MessageBus.MODES, default="sync")
+    parser.add_argument("--ontology-mode", choices=OntologySync.MODES, default="step")
+    parser.add_argument("--ontology-interval", type=int, default=1,
+                        help="steps between ontology flushes for --ontology-mode interval")
+    parser.add_argument("--ontology-path", default=None,
+                        help="SQLite file backing the ontology (resumes if it exists)")
+    parser.add_argument("--commit-interval", type=int, default=10,
+                        help="steps per transaction for --ontology-path")
+    parser.add_argument("--log", choices=EventLog.MODES, default="print",
+                        help="print every event, JSON lines for every Nth event, or counts only")
+    parser.add_argument("--log-every", type=int, default=100,
+                        help="event sampling interval for --log sampled")
+    parser.add_argument("--output", default=None,
+                        help="write the collected statistics to this .csv or .json file")
+    parser.add_argument("--profile-steps", type=int, nargs=2, metavar=("START", "STOP"), default=None,
+                        help="cProfile steps START <= step < STOP and print the top functions")
+    args = parser.parse_args(argv)
+    if args.log_every < 1:
+        parser.error("--log-every must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = run_simulation(args.customers, args.employees, args.books, args.steps,
+                           log_mode=args.log, log_every=args.log_every, seed=args.seed,
+                           engine=args.engine, message_mode=args.message_mode,
+                           ontology_mode=args.ontology_mode, ontology_interval=args.ontology_interval,
+                           ontology_path=args.ontology_path, commit_interval=args.commit_interval,
+                           profile_steps=args.profile_steps)
+    
+    if args.log == "print" and model.engine is None:
+        inspect_ontology(model)
         generate_report(model)
         
         print("\n" + "=" * 60)
@@ -512,8 +1865,34 @@ if __name__ == "__main__":
         print("✓ Employee restocking behavior")
         print("✓ Real-time ontology updates")
         print("=" * 60)
-        
+        print(f"{args.steps} steps in {model.elapsed:.2f}s "
+              f"({args.steps / model.elapsed if model.elapsed else 0.0:.1f} steps/s)")
+    else:
+        summary = {"steps": args.steps, "elapsed": model.elapsed,
+                   "steps_per_second": args.steps / model.elapsed if model.elapsed else 0.0,
+                   "events": model.event_log.summary(), "final": model.datacollector.latest(),
+                   **model.instrumentation()}
+        print(json.dumps(json_ready(summary)))
+    
+    stats = model.profiler.profile_stats()
+    if stats:
+        stats.print_stats(25)
+    
+    if args.output:
+        data = model.datacollector.get_model_vars_dataframe()
+        if args.output.endswith(".json"):
+            data.to_json(args.output, orient="records")
+        else:
+            data.to_csv(args.output, index_label="step")
+    
+    model.close()
+
+if __name__ == "__main__":
+    try:
+        main()
     except Exception as e:
         print(f"Error during simulation: {e}")
+        import sys
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Synthetic book catalogs for load-testing BookstoreModel.
+#
+# The hand-written BOOK_DATA only has 15 books. generate_catalog() keeps those
+# as the first books and pads the catalog with generated ones whose genres,
+# authors and prices follow skewed, roughly realistic distributions: a few
+# genres hold most of the books (Zipf-like), a few prolific authors write many
+# of them, and prices are log-normal around each genre's typical price.
+
+ADJECTIVES = ["Silent", "Hidden", "Last", "Broken", "Golden", "Lost", "Secret", "Endless",
+              "Crimson", "Quiet", "Distant", "Forgotten", "Bright", "Wild", "Hollow", "Final"]
+NOUNS = ["River", "Empire", "Garden", "Signal", "Kingdom", "Algorithm", "Voyage", "Archive",
+         "Mountain", "Harbor", "Machine", "Letter", "Forest", "Theory", "City", "Promise"]
+FIRST_NAMES = ["Anna", "Ben", "Chloe", "Daniel", "Emma", "Felix", "Grace", "Hugo", "Iris",
+               "James", "Kira", "Liam", "Maya", "Noah", "Olivia", "Paul", "Quinn", "Rosa",
+               "Sam", "Tara", "Umar", "Vera", "Will", "Yara", "Zoe"]
+LAST_NAMES = ["Adams", "Baker", "Clark", "Diaz", "Evans", "Fischer", "Garcia", "Hughes",
+              "Ito", "Jensen", "Khan", "Lopez", "Moore", "Nguyen", "Okafor", "Patel",
+              "Reyes", "Schmidt", "Tanaka", "Usman", "Varga", "Walsh", "Young", "Zhang"]
+
+def zipf_weights(n, exponent=1.1):
+    """Normalized weights proportional to 1 / rank**exponent"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+def author_name(i):
+    """Unique author name number i, e.g. "Anna Adams", ..., "Anna Adams 2" """
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    last = LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    generation = i // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{first} {last}" + (f" {generation + 1}" if generation else "")
+
+def generate_catalog(num_books, rng, base=(), books_per_author=8, genre_exponent=0.8,
+                     author_exponent=0.8, price_sigma=0.25):
+    """Return num_books (title, author, genre, price) tuples.
+
+    The first books are taken from base; the rest are generated. Genres are
+    those of base, in order of first appearance, so the earlier genres are
+    the most common ones. rng is a NumPy Generator, so a seeded model always
+    gets the same catalog.
+    """
+    base = list(base)
+    if num_books <= len(base):
+        return base[:num_books]
+    count = num_books - len(base)
+
+    # Genres and their typical price, from the base catalog
+    genres = list(dict.fromkeys(genre for _, _, genre, _ in base)) or ["Fiction"]
+    base_price = {genre: np.mean([price for _, _, g, price in base if g == genre] or [20.0])
+                  for genre in genres}
+    genre_ids = rng.choice(len(genres), size=count, p=zipf_weights(len(genres), genre_exponent))
+
+    # A shared author pool where a few authors write most of the books
+    num_authors = max(1, count // books_per_author)
+    authors = [author_name(i) for i in range(num_authors)]
+    author_ids = rng.choice(num_authors, size=count, p=zipf_weights(num_authors, author_exponent))
+
+    # Log-normal prices around each genre's typical price, ending in .99
+    typical = np.array([base_price[genre] for genre in genres])[genre_ids]
+    prices = np.maximum(np.round(typical * rng.lognormal(0.0, price_sigma, size=count)), 5) - 0.01
+
+    adjectives = rng.integers(len(ADJECTIVES), size=count)
+    nouns = rng.integers(len(NOUNS), size=count)
+
+    generated = [
+        (f"The {ADJECTIVES[a]} {NOUNS[n]} #{len(base) + i}", authors[author], genres[genre], float(price))
+        for i, (a, n, author, genre, price) in enumerate(zip(adjectives.tolist(), nouns.tolist(),
+                                                             author_ids.tolist(), genre_ids.tolist(),
+                                                             prices.tolist()))
+    ]
+    return base + generated
+
+if __name__ == "__main__":
+    from collections import Counter
+    from bookstore_system import BOOK_DATA
+
+    catalog = generate_catalog(10_000, np.random.default_rng(0), BOOK_DATA)
+    print(f"{len(catalog)} books, {len({author for _, author, _, _ in catalog})} authors")
+    print("Books per genre:", Counter(genre for _, _, genre, _ in catalog).most_common())
+    print("Top authors:", Counter(author for _, author, _, _ in catalog).most_common(5))
+    prices = np.array([price for _, _, _, price in catalog])
+    print(f"Prices: min {prices.min():.2f}, median {np.median(prices):.2f}, max {prices.max():.2f}")
@@ -2,18 +2,138 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 import time
+from collections import deque
 from datetime import datetime
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.animation as animation
 import networkx as nx
+import numpy as np
 import sys
 import os
 
 # Add parent directory to path to import bookstore_system
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from bookstore_system import BookstoreModel, Book, Customer, Employee, Order, message_bus
-import queue
+from bookstore_system import BookstoreModel
+
+# Analytics charts: (statistic, title, y label, line style)
+ANALYTICS_PLOTS = [
+    ('Total Stock', 'Total Stock Over Time', 'Stock', 'b-'),
+    ('Total Sales', 'Total Sales Over Time', 'Sales', 'g-'),
+    ('Average Customer Budget', 'Average Customer Budget', 'Budget ($)', 'r-'),
+    ('Customer Satisfaction', 'Customer Satisfaction', 'Satisfaction', 'm-')
+]
+
+class PlotHistory:
+    """The last `capacity` steps of a few statistics, in preallocated arrays"""
+    
+    def __init__(self, columns, capacity=10000):
+        self.columns = columns
+        self.capacity = capacity
+        self.steps = np.zeros(capacity)
+        self.values = np.zeros((capacity, len(columns)))
+        self.total = 0  # rows ever appended
+    
+    def __len__(self):
+        return min(self.total, self.capacity)
+    
+    def extend(self, steps, names, values):
+        """Append rows of values, whose columns are named by names"""
+        values = values[:, [names.index(column) for column in self.columns]]
+        if len(steps) > self.capacity:
+            self.total += len(steps) - self.capacity
+            steps, values = steps[-self.capacity:], values[-self.capacity:]
+        indices = np.arange(self.total, self.total + len(steps)) % self.capacity
+        self.steps[indices] = steps
+        self.values[indices] = values
+        self.total += len(steps)
+    
+    def clear(self):
+        self.total = 0
+    
+    def view(self, window=None, max_points=None):
+        """(steps, values) of the last `window` rows, oldest first, thinned to at most max_points"""
+        count = len(self) if window is None else min(window, len(self))
+        indices = np.arange(self.total - count, self.total) % self.capacity
+        if max_points and count > max_points:
+            indices = indices[np.linspace(0, count - 1, max_points).astype(int)]
+        return self.steps[indices], self.values[indices]
+
+class PagedTable:
+    """A Treeview that shows one page of a large table at a time.
+    
+    Every row keeps a stable item id (the agent id) and a refresh only
+    touches rows whose values changed, so its cost depends on the page size
+    and the changed rows, not on the size of the table.
+    """
+    def __init__(self, parent, columns, width=100, page_size=200):
+        self.page_size = page_size
+        self.page = 0
+        self.count = 0
+        self.row_at = None
+        self.shown = {}  # item id -> values currently displayed
+        
+        table_frame = tk.Frame(parent)
+        table_frame.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width)
+        
+        # Scrollbar for treeview
+        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side='left', fill='both', expand=True, padx=5, pady=5)
+        scrollbar.pack(side='right', fill='y', pady=5)
+        
+        # Paging controls
+        nav_frame = tk.Frame(parent)
+        nav_frame.pack(fill='x', padx=5, pady=(0, 5))
+        tk.Button(nav_frame, text="< Prev", command=lambda: self.set_page(self.page - 1)).pack(side='left')
+        tk.Button(nav_frame, text="Next >", command=lambda: self.set_page(self.page + 1)).pack(side='left', padx=5)
+        self.page_var = tk.StringVar(value="No rows")
+        tk.Label(nav_frame, textvariable=self.page_var).pack(side='left', padx=10)
+    
+    @property
+    def pages(self):
+        return max(1, -(-self.count // self.page_size))
+    
+    def set_page(self, page):
+        """Show another page and refresh it from the last row source"""
+        self.page = max(0, min(page, self.pages - 1))
+        if self.row_at is not None:
+            self.refresh(self.count, self.row_at)
+    
+    def refresh(self, count, row_at):
+        """Show rows of the current page; row_at(index) returns (item id, values)"""
+        self.count, self.row_at = count, row_at
+        self.page = min(self.page, self.pages - 1)
+        start = self.page * self.page_size
+        stop = min(count, start + self.page_size)
+        
+        visible = {}
+        for index in range(start, stop):
+            iid, values = row_at(index)
+            visible[iid] = values
+            if iid not in self.shown:
+                self.tree.insert('', index - start, iid=iid, values=values)
+            elif self.shown[iid] != values:
+                self.tree.item(iid, values=values)
+        for iid in self.shown.keys() - visible.keys():
+            self.tree.delete(iid)
+        self.shown = visible
+        
+        if count:
+            self.page_var.set(f"Rows {start + 1}-{stop} of {count} (page {self.page + 1}/{self.pages})")
+        else:
+            self.page_var.set("No rows")
+    
+    def clear(self):
+        if self.shown:
+            self.tree.delete(*self.shown)
+        self.shown = {}
+        self.count, self.row_at = 0, None
+        self.page_var.set("No rows")
 
 class BookstoreGUI:
     def __init__(self, root):
@@ -26,15 +146,25 @@ class BookstoreGUI:
         self.model = None
         self.simulation_running = False
         self.simulation_thread = None
-        self.step_count = 0
-        self.message_queue = queue.Queue()
+        self.ontology = None  # the last model.ontology_view() shown
+        self.structure_layout = None  # (graph, positions) of the class structure diagram
+        self.node_positions = {}  # instances diagram node -> last layout position
+        self.layout_rng = np.random.default_rng(0)
+        self.diagram_budget = 60  # nodes drawn in the instances diagram
+        
+        # Update pipeline: the model publishes a read-only snapshot after each
+        # step and the UI renders the newest one every frame_interval ms; it
+        # never reads the live model while the simulation thread runs
+        self.frame_interval = 100
+        self.max_steps_per_second = 1.0  # None runs as fast as possible
+        self.reset_frames()
         
         # Create main interface
         self.create_widgets()
         self.setup_plots()
         
-        # Start message monitoring
-        self.root.after(100, self.check_messages)
+        # Start rendering
+        self.root.after(self.frame_interval, self.render_frame)
     
     def create_widgets(self):
         """Create the main GUI widgets"""
@@ -84,6 +214,13 @@ class BookstoreGUI:
         self.books_var = tk.StringVar(value="12")
         tk.Entry(params_frame, textvariable=self.books_var, width=5).grid(row=0, column=5, padx=5)
         
+        tk.Label(params_frame, text="Steps/s:", fg='white', bg='#34495e').grid(row=0, column=6, sticky='w', padx=(10,0))
+        self.speed_var = tk.StringVar(value="1")
+        speed_box = ttk.Combobox(params_frame, textvariable=self.speed_var, width=6, state='readonly',
+                                 values=("1", "2", "5", "10", "50", "Max"))
+        speed_box.grid(row=0, column=7, padx=5)
+        speed_box.bind('<<ComboboxSelected>>', self.set_speed)
+        
         # Control buttons
         buttons_frame = tk.Frame(control_frame, bg='#34495e')
         buttons_frame.pack(side='right', padx=10, pady=10)
@@ -134,6 +271,20 @@ class BookstoreGUI:
             label.grid(row=row//3, column=row%3, sticky='w', padx=20, pady=5)
             row += 1
         
+        # Step profile: per-phase timings and instrumentation counters
+        profile_frame = tk.LabelFrame(sim_frame, text="Step Profile", font=('Arial', 12, 'bold'))
+        profile_frame.pack(fill='x', padx=10, pady=5)
+        
+        self.profile_vars = {
+            'timing': tk.StringVar(value="Step time: -"),
+            'phases': tk.StringVar(value="Phases: -"),
+            'counters': tk.StringVar(value="Counters: -"),
+            'pipeline': tk.StringVar(value="Display: -")
+        }
+        for var in self.profile_vars.values():
+            tk.Label(profile_frame, textvariable=var, font=('Consolas', 10), anchor='w',
+                     justify='left').pack(fill='x', padx=20, pady=2)
+        
         # Activity log
         log_frame = tk.LabelFrame(sim_frame, text="Activity Log", font=('Arial', 12, 'bold'))
         log_frame.pack(fill='both', expand=True, padx=10, pady=5)
@@ -150,20 +301,9 @@ class BookstoreGUI:
         list_frame = tk.LabelFrame(inv_frame, text="Book Inventory", font=('Arial', 12, 'bold'))
         list_frame.pack(fill='both', expand=True, padx=10, pady=5)
         
-        # Treeview for books
+        # Paged treeview for books
         columns = ('ID', 'Title', 'Author', 'Genre', 'Price', 'Stock', 'Sales')
-        self.books_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
-        
-        for col in columns:
-            self.books_tree.heading(col, text=col)
-            self.books_tree.column(col, width=100)
-        
-        # Scrollbar for treeview
-        books_scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.books_tree.yview)
-        self.books_tree.configure(yscrollcommand=books_scrollbar.set)
-        
-        self.books_tree.pack(side='left', fill='both', expand=True, padx=5, pady=5)
-        books_scrollbar.pack(side='right', fill='y', pady=5)
+        self.books_table = PagedTable(list_frame, columns, width=100)
     
     def create_customers_tab(self):
         """Create the customers tab"""
@@ -174,26 +314,28 @@ class BookstoreGUI:
         list_frame = tk.LabelFrame(cust_frame, text="Customer Information", font=('Arial', 12, 'bold'))
         list_frame.pack(fill='both', expand=True, padx=10, pady=5)
         
-        # Treeview for customers
+        # Paged treeview for customers
         columns = ('ID', 'Budget', 'Purchased Books', 'Satisfaction', 'Preferred Genres')
-        self.customers_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
-        
-        for col in columns:
-            self.customers_tree.heading(col, text=col)
-            self.customers_tree.column(col, width=120)
-        
-        # Scrollbar for treeview
-        cust_scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.customers_tree.yview)
-        self.customers_tree.configure(yscrollcommand=cust_scrollbar.set)
-        
-        self.customers_tree.pack(side='left', fill='both', expand=True, padx=5, pady=5)
-        cust_scrollbar.pack(side='right', fill='y', pady=5)
+        self.customers_table = PagedTable(list_frame, columns, width=120)
     
     def create_analytics_tab(self):
         """Create the analytics tab with charts"""
         analytics_frame = ttk.Frame(self.notebook)
         self.notebook.add(analytics_frame, text="Analytics")
         
+        # History window and downsampling controls
+        controls = tk.Frame(analytics_frame)
+        controls.pack(fill='x', padx=10, pady=(5, 0))
+        tk.Label(controls, text="History (steps):").pack(side='left')
+        self.plot_window_var = tk.StringVar(value="1000")
+        window_box = ttk.Combobox(controls, textvariable=self.plot_window_var, width=7, state='readonly',
+                                  values=("20", "100", "1000", "10000"))
+        window_box.pack(side='left', padx=5)
+        window_box.bind('<<ComboboxSelected>>', self.set_plot_window)
+        self.downsample_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(controls, text="Downsample to 500 points", variable=self.downsample_var,
+                       command=self.set_plot_window).pack(side='left', padx=10)
+        
         self.analytics_frame = analytics_frame
     
     def create_ontology_tab(self):
@@ -264,21 +406,30 @@ class BookstoreGUI:
     
     def setup_plots(self):
         """Setup matplotlib plots for analytics"""
-        self.fig, ((self.ax1, self.ax2), (self.ax3, self.ax4)) = plt.subplots(2, 2, figsize=(12, 8))
+        self.fig, axes = plt.subplots(2, 2, figsize=(12, 8))
         self.fig.suptitle('Bookstore Analytics Dashboard', fontsize=16)
         
-        # Initialize empty data
-        self.plot_data = {
-            'steps': [],
-            'total_stock': [],
-            'total_sales': [],
-            'avg_budget': [],
-            'satisfaction': []
-        }
+        # Lines are created once and animated: full draws leave them out, and
+        # update_plots blits them over the saved background
+        self.plot_axes = list(axes.flat)
+        self.plot_lines = []
+        for ax, (column, title, ylabel, style) in zip(self.plot_axes, ANALYTICS_PLOTS):
+            line, = ax.plot([], [], style, linewidth=2, animated=True)
+            ax.set_title(title)
+            ax.set_ylabel(ylabel)
+            self.plot_lines.append(line)
+        for ax in axes[1]:
+            ax.set_xlabel('Step')
+        
+        self.plot_history = PlotHistory([column for column, _, _, _ in ANALYTICS_PLOTS])
+        self.plot_window = 1000
+        self.plot_points = 500  # None draws every point in the window
+        self.plot_background = None
         
         # Canvas for matplotlib
         self.canvas = FigureCanvasTkAgg(self.fig, self.analytics_frame)
         self.canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=5)
+        self.canvas.mpl_connect('draw_event', self.on_plot_draw)
         
         # Initialize log message after all widgets are created
         self.root.after(100, lambda: self.log_message("System initialized. Ready to start simulation."))
@@ -290,9 +441,8 @@ class BookstoreGUI:
             num_employees = int(self.employees_var.get())
             num_books = int(self.books_var.get())
             
-            self.model = BookstoreModel(num_customers, num_employees, num_books)
+            self.replace_model(BookstoreModel(num_customers, num_employees, num_books, snapshots=True))
             self.simulation_running = True
-            self.step_count = 0
             
             # Update UI
             self.start_btn.config(state='disabled')
@@ -301,7 +451,6 @@ class BookstoreGUI:
             
             # Clear previous data
             self.activity_log.delete(1.0, tk.END)
-            self.plot_data = {key: [] for key in self.plot_data.keys()}
             
             # Start simulation thread
             self.simulation_thread = threading.Thread(target=self.run_simulation_loop)
@@ -323,13 +472,14 @@ class BookstoreGUI:
     
     def single_step(self):
         """Execute a single simulation step"""
+        if self.simulation_thread and self.simulation_thread.is_alive():
+            return  # the simulation thread owns the model until its last step ends
         if self.model is None:
             try:
                 num_customers = int(self.customers_var.get())
                 num_employees = int(self.employees_var.get())
                 num_books = int(self.books_var.get())
-                self.model = BookstoreModel(num_customers, num_employees, num_books)
-                self.step_count = 0
+                self.replace_model(BookstoreModel(num_customers, num_employees, num_books, snapshots=True))
                 self.log_message("Model created for single step execution")
             except ValueError:
                 messagebox.showerror("Error", "Please enter valid numbers for simulation parameters")
@@ -337,158 +487,231 @@ class BookstoreGUI:
         
         self.execute_step()
     
+    def replace_model(self, model):
+        """Swap in a new model, releasing the previous model's world and message bus"""
+        old_model = self.model
+        if self.simulation_thread and self.simulation_thread.is_alive():
+            self.simulation_running = False
+            self.simulation_thread.join()
+        self.model = model
+        self.ontology = None
+        self.node_positions = {}
+        self.layout_rng = np.random.default_rng(0)
+        self.reset_frames()
+        self.plot_history.clear()
+        self.redraw_plots()
+        self.books_table.clear()
+        self.customers_table.clear()
+        if old_model:
+            old_model.close()
+    
+    def set_speed(self, event=None):
+        """Apply the steps/s limit chosen in the control panel"""
+        speed = self.speed_var.get()
+        self.max_steps_per_second = None if speed == "Max" else float(speed)
+    
     def run_simulation_loop(self):
         """Main simulation loop running in separate thread"""
         while self.simulation_running:
+            start = time.perf_counter()
             self.execute_step()
-            time.sleep(1)  # 1 second delay between steps
+            
+            # Pace the loop unless running as fast as possible
+            limit = self.max_steps_per_second
+            if limit:
+                time.sleep(max(0.0, 1 / limit - (time.perf_counter() - start)))
     
     def execute_step(self):
-        """Execute a single step and update GUI"""
+        """Execute a single step; the model publishes a snapshot for the UI"""
         if self.model:
-            self.step_count += 1
             self.model.step()
+    
+    def reset_frames(self):
+        """Forget the frame counters of a previous model"""
+        self.frames_rendered = 0
+        self.rendered_frames = deque(maxlen=20)  # (step, time) of recent frames, for steps/s
+    
+    def render_frame(self):
+        """Render the newest model snapshot, if there is a new one"""
+        snapshot = self.model.snapshots.take() if self.model else None
+        if snapshot is not None:
+            self.frames_rendered += 1
+            self.rendered_frames.append((snapshot.step, snapshot.time))
+            self.update_statistics(snapshot)
+            self.update_inventory(snapshot)
+            self.update_customers(snapshot)
+            self.update_plots(snapshot)
+            self.update_bus_messages(snapshot)
+            if snapshot.ontology is not None:
+                self.show_ontology(snapshot.ontology)
             
-            # Queue GUI updates
-            self.message_queue.put(('update_stats', None))
-            self.message_queue.put(('update_inventory', None))
-            self.message_queue.put(('update_customers', None))
-            self.message_queue.put(('update_plots', None))
-    
-    def check_messages(self):
-        """Check for messages from simulation thread and update GUI"""
-        try:
-            while True:
-                msg_type, data = self.message_queue.get_nowait()
-                
-                if msg_type == 'update_stats':
-                    self.update_statistics()
-                elif msg_type == 'update_inventory':
-                    self.update_inventory()
-                elif msg_type == 'update_customers':
-                    self.update_customers()
-                elif msg_type == 'update_plots':
-                    self.update_plots()
-                elif msg_type == 'log_message':
-                    self.log_message(data)
-                    
-        except queue.Empty:
-            pass
-        
-        # Schedule next check
-        self.root.after(100, self.check_messages)
-    
-    def update_statistics(self):
+            # Simulation speed over the recent frames, and snapshots never shown
+            first_step, first_time = self.rendered_frames[0]
+            elapsed = snapshot.time - first_time
+            rate = (snapshot.step - first_step) / elapsed if elapsed > 0 else 0.0
+            self.profile_vars['pipeline'].set(
+                f"Display: {rate:.1f} steps/s | frames rendered {self.frames_rendered}, "
+                f"dropped {self.model.snapshots.coalesced}")
+        
+        self.root.after(self.frame_interval, self.render_frame)
+    
+    def update_statistics(self, snapshot):
         """Update the statistics display"""
-        if not self.model:
-            return
-        
-        # Get latest data
-        data = self.model.datacollector.get_model_vars_dataframe()
-        if not data.empty:
-            latest = data.iloc[-1]
-            
-            self.stats_vars['step'].set(f"Step: {self.step_count}")
+        latest = snapshot.stats
+        if latest:
+            self.stats_vars['step'].set(f"Step: {snapshot.step}")
             self.stats_vars['total_books'].set(f"Total Books: {int(latest['Total Books'])}")
             self.stats_vars['total_stock'].set(f"Total Stock: {int(latest['Total Stock'])}")
             self.stats_vars['total_sales'].set(f"Total Sales: {int(latest['Total Sales'])}")
             self.stats_vars['avg_budget'].set(f"Avg Customer Budget: ${latest['Average Customer Budget']:.2f}")
             self.stats_vars['satisfaction'].set(f"Customer Satisfaction: {latest['Customer Satisfaction']:.2f}")
-    
-    def update_inventory(self):
-        """Update the inventory display"""
-        if not self.model:
-            return
         
-        # Clear existing items
-        for item in self.books_tree.get_children():
-            self.books_tree.delete(item)
-        
-        # Add current book data
-        book_agents = [a for a in self.model.schedule.agents if hasattr(a, 'title')]
-        for book in book_agents:
-            self.books_tree.insert('', 'end', values=(
-                book.unique_id,
-                book.title,
-                book.author,
-                book.genre,
-                f"${book.price:.2f}",
-                book.stock,
-                book.total_sales
-            ))
-    
-    def update_customers(self):
+        # Step profile
+        instrumentation = snapshot.instrumentation
+        profile, counters = instrumentation['profile'], instrumentation['counters']
+        self.profile_vars['timing'].set(
+            f"Step time: {profile['last_step_ms']:.1f} ms (mean {profile['mean_step_ms']:.1f} ms, "
+            f"max {profile['max_step_ms']:.1f} ms, {profile['steps_per_second']:.1f} steps/s)")
+        self.profile_vars['phases'].set("Phases: " + " | ".join(
+            f"{phase} {timing['mean_ms']:.2f} ms ({timing['share']:.0%})"
+            for phase, timing in profile['phases'].items()))
+        self.profile_vars['counters'].set(
+            f"Messages: {sum(counters['messages_published'].values())} published, "
+            f"{sum(counters['messages_delivered'].values())} delivered | "
+            f"Ontology mutations: {counters['ontology_mutations']} | "
+            f"Purchases: {counters['purchases']} | Restocks: {counters['restocks']}")
+    
+    def update_inventory(self, snapshot):
+        """Update the inventory display; only the rows on the current page are read"""
+        self.books_table.refresh(len(snapshot.book_ids), lambda index: self.book_row(snapshot, index))
+    
+    def book_row(self, snapshot, index):
+        book_id = int(snapshot.book_ids[index])
+        return str(book_id), (
+            book_id,
+            snapshot.book_titles[index],
+            snapshot.book_authors[index],
+            snapshot.book_genres[index],
+            f"${snapshot.book_prices[index]:.2f}",
+            int(snapshot.book_stock[index]),
+            int(snapshot.book_sales[index])
+        )
+    
+    def update_customers(self, snapshot):
         """Update the customers display"""
-        if not self.model:
-            return
-        
-        # Clear existing items
-        for item in self.customers_tree.get_children():
-            self.customers_tree.delete(item)
-        
-        # Add current customer data
-        customer_agents = [a for a in self.model.schedule.agents if hasattr(a, 'budget')]
-        for customer in customer_agents:
-            genres = ', '.join(customer.preferred_genres)
-            self.customers_tree.insert('', 'end', values=(
-                customer.unique_id,
-                f"${customer.budget:.2f}",
-                len(customer.purchased_books),
-                f"{customer.satisfaction:.2f}",
-                genres
-            ))
-    
-    def update_plots(self):
-        """Update the analytics plots"""
-        if not self.model:
+        self.customers_table.refresh(len(snapshot.customer_ids),
+                                     lambda index: self.customer_row(snapshot, index))
+    
+    def customer_row(self, snapshot, index):
+        customer_id = int(snapshot.customer_ids[index])
+        return str(customer_id), (
+            customer_id,
+            f"${snapshot.customer_budgets[index]:.2f}",
+            int(snapshot.customer_purchases[index]),
+            f"{snapshot.customer_satisfaction[index]:.2f}",
+            snapshot.customer_genres[index]
+        )
+    
+    def update_plots(self, snapshot):
+        """Update the analytics plots with the statistics rows since the last snapshot"""
+        if not len(snapshot.history_steps):
             return
         
-        # Get latest data
-        data = self.model.datacollector.get_model_vars_dataframe()
-        if data.empty:
-            return
+        # Every step is kept even when frames were dropped
+        self.plot_history.extend(snapshot.history_steps, snapshot.stat_names, snapshot.history)
         
-        latest = data.iloc[-1]
-        
-        # Update plot data
-        self.plot_data['steps'].append(self.step_count)
-        self.plot_data['total_stock'].append(latest['Total Stock'])
-        self.plot_data['total_sales'].append(latest['Total Sales'])
-        self.plot_data['avg_budget'].append(latest['Average Customer Budget'])
-        self.plot_data['satisfaction'].append(latest['Customer Satisfaction'])
-        
-        # Keep only last 20 data points
-        for key in self.plot_data:
-            if len(self.plot_data[key]) > 20:
-                self.plot_data[key] = self.plot_data[key][-20:]
-        
-        # Clear and update plots
-        self.ax1.clear()
-        self.ax1.plot(self.plot_data['steps'], self.plot_data['total_stock'], 'b-', linewidth=2)
-        self.ax1.set_title('Total Stock Over Time')
-        self.ax1.set_ylabel('Stock')
-        
-        self.ax2.clear()
-        self.ax2.plot(self.plot_data['steps'], self.plot_data['total_sales'], 'g-', linewidth=2)
-        self.ax2.set_title('Total Sales Over Time')
-        self.ax2.set_ylabel('Sales')
-        
-        self.ax3.clear()
-        self.ax3.plot(self.plot_data['steps'], self.plot_data['avg_budget'], 'r-', linewidth=2)
-        self.ax3.set_title('Average Customer Budget')
-        self.ax3.set_ylabel('Budget ($)')
-        self.ax3.set_xlabel('Step')
-        
-        self.ax4.clear()
-        self.ax4.plot(self.plot_data['steps'], self.plot_data['satisfaction'], 'm-', linewidth=2)
-        self.ax4.set_title('Customer Satisfaction')
-        self.ax4.set_ylabel('Satisfaction')
-        self.ax4.set_xlabel('Step')
-        
-        self.canvas.draw()
+        if self.set_plot_data() or self.plot_background is None:
+            # Limits changed, so the axes need a full draw; on_plot_draw adds the lines
+            self.canvas.draw_idle()
+        else:
+            self.canvas.restore_region(self.plot_background)
+            for ax, line in zip(self.plot_axes, self.plot_lines):
+                ax.draw_artist(line)
+            self.canvas.blit(self.fig.bbox)
+    
+    def set_plot_data(self):
+        """Point the lines at the current history window; True if any axis limits changed"""
+        steps, values = self.plot_history.view(self.plot_window, self.plot_points)
+        rescaled = False
+        for i, (ax, line) in enumerate(zip(self.plot_axes, self.plot_lines)):
+            line.set_data(steps, values[:, i])
+            if len(steps):
+                rescaled = self.fit_limits(ax, steps, values[:, i]) or rescaled
+        return rescaled
+    
+    @staticmethod
+    def fit_limits(ax, x, y):
+        """Refit ax's limits, with headroom, once the data leaves them; True if they changed"""
+        xmin, xmax = ax.get_xlim()
+        ymin, ymax = ax.get_ylim()
+        low, high = y.min(), y.max()
+        if x[0] >= xmin and x[-1] <= xmax and low >= ymin and high <= ymax:
+            return False
+        
+        # Headroom to the right so the next steps can be blitted without a full draw
+        ax.set_xlim(x[0], x[-1] + max(10, 0.25 * (x[-1] - x[0])))
+        margin = 0.1 * max(high - low, abs(high), 1)
+        ax.set_ylim(low - margin, high + margin)
+        return True
+    
+    def on_plot_draw(self, event):
+        """Save the background of a full draw and draw the animated lines over it"""
+        self.plot_background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for ax, line in zip(self.plot_axes, self.plot_lines):
+            ax.draw_artist(line)
+    
+    def redraw_plots(self):
+        """Refit every axis to the current history window and redraw"""
+        for ax in self.plot_axes:
+            ax.set_xlim(0, 1)
+            ax.set_ylim(0, 1)
+        self.set_plot_data()
+        self.canvas.draw_idle()
+    
+    def set_plot_window(self, event=None):
+        """Apply the history window and downsampling chosen in the analytics tab"""
+        self.plot_window = int(self.plot_window_var.get())
+        self.plot_points = 500 if self.downsample_var.get() else None
+        self.redraw_plots()
+    
+    def update_bus_messages(self, snapshot):
+        """Append message bus traffic published since the last snapshot"""
+        for topic, message in snapshot.messages:
+            self.messages_text.insert(tk.END, f"[{topic}] {message}\n")
+        
+        # Keep the widget bounded in long runs
+        lines = int(self.messages_text.index('end-1c').split('.')[0])
+        if lines > 2000:
+            self.messages_text.delete(1.0, f"{lines - 2000}.0")
+        self.messages_text.see(tk.END)
     
     def refresh_ontology(self):
         """Refresh the ontology display and diagram"""
+        if self.model and self.simulation_thread and self.simulation_thread.is_alive():
+            # The ontology is read by the simulation thread after its next step
+            # and arrives with that step's snapshot
+            self.model.snapshots.request_ontology()
+            self.ontology_text.delete(1.0, tk.END)
+            self.ontology_text.insert(tk.END, "Reading the ontology after the next step...")
+            self.root.after(100, self.await_ontology)
+        else:
+            # Nothing is stepping the model, so it can be read here; this also
+            # applies buffered writes and exports orders
+            self.show_ontology(self.model.ontology_view() if self.model else None)
+    
+    def await_ontology(self):
+        """Read the ontology here if the simulation thread stopped before serving the request"""
+        if not self.model or not self.model.snapshots.ontology_requested:
+            return  # served with a snapshot, or the model was replaced
+        if self.simulation_thread and self.simulation_thread.is_alive():
+            self.root.after(100, self.await_ontology)
+            return
+        self.model.snapshots.ontology_requested = False
+        self.show_ontology(self.model.ontology_view())
+    
+    def show_ontology(self, view):
+        """Display a model.ontology_view() and redraw the diagram"""
+        self.ontology = view
         self.ontology_text.delete(1.0, tk.END)
         
         ontology_info = []
@@ -496,18 +719,24 @@ class BookstoreGUI:
         ontology_info.append("=" * 50)
         ontology_info.append("")
         
-        # Books
-        ontology_info.append("Books in ontology:")
-        for book in Book.instances():
-            name = book.hasName[0] if book.hasName else 'Unnamed'
-            price = f"${book.hasPrice[0]:.2f}" if book.hasPrice else 'No price'
-            stock = f"{book.availableQuantity[0]}" if book.availableQuantity else 'Unknown stock'
-            ontology_info.append(f"  - {name} | {price} | Stock: {stock}")
-        
-        ontology_info.append("")
-        ontology_info.append(f"Total Customers: {len(list(Customer.instances()))}")
-        ontology_info.append(f"Total Employees: {len(list(Employee.instances()))}")
-        ontology_info.append(f"Total Orders: {len(list(Order.instances()))}")
+        # Books (each model owns its ontology)
+        if view:
+            counts = view['counts']
+            ontology_info.append("Books in ontology:")
+            for name, price, stock in view['books']:
+                name = name or 'Unnamed'
+                price = f"${price:.2f}" if price is not None else 'No price'
+                stock = f"{stock}" if stock is not None else 'Unknown stock'
+                ontology_info.append(f"  - {name} | {price} | Stock: {stock}")
+            if counts['Book'] > len(view['books']):
+                ontology_info.append(f"  ... and {counts['Book'] - len(view['books'])} more")
+            
+            ontology_info.append("")
+            ontology_info.append(f"Total Customers: {counts['Customer']}")
+            ontology_info.append(f"Total Employees: {counts['Employee']}")
+            ontology_info.append(f"Total Orders: {counts['Order']}")
+        else:
+            ontology_info.append("No active simulation")
         
         # Add relationship information
         ontology_info.append("")
@@ -530,38 +759,39 @@ class BookstoreGUI:
         """Create and display the ontology structure diagram"""
         self.onto_ax.clear()
         
-        # Create a directed graph
-        G = nx.DiGraph()
-        
         if self.diagram_view.get() == "structure":
-            self._create_structure_diagram(G)
+            self._create_structure_diagram()
         else:
-            self._create_instances_diagram(G)
+            self._create_instances_diagram()
     
-    def _create_structure_diagram(self, G):
+    def _create_structure_diagram(self):
         """Create ontology structure diagram showing classes and relationships"""
-        # Define ontology classes
-        classes = ['Book', 'Customer', 'Employee', 'Order', 'Author', 'Genre', 'Inventory']
-        
-        # Add nodes for classes
-        for cls in classes:
-            G.add_node(cls, node_type='class')
-        
-        # Add relationships (edges)
-        relationships = [
-            ('Book', 'Author', 'hasAuthor'),
-            ('Book', 'Genre', 'hasGenre'),
-            ('Customer', 'Book', 'purchases'),
-            ('Customer', 'Order', 'creates'),
-            ('Employee', 'Order', 'fulfills'),
-            ('Inventory', 'Book', 'contains')
-        ]
-        
-        for source, target, relation in relationships:
-            G.add_edge(source, target, label=relation)
-        
-        # Create layout
-        pos = nx.spring_layout(G, k=3, iterations=50)
+        # The class structure never changes, so the graph and its layout are built once
+        if self.structure_layout is None:
+            G = nx.DiGraph()
+            
+            # Define ontology classes
+            classes = ['Book', 'Customer', 'Employee', 'Order', 'Author', 'Genre', 'Inventory']
+            
+            # Add nodes for classes
+            for cls in classes:
+                G.add_node(cls, node_type='class')
+            
+            # Add relationships (edges)
+            relationships = [
+                ('Book', 'Author', 'hasAuthor'),
+                ('Book', 'Genre', 'hasGenre'),
+                ('Customer', 'Book', 'purchases'),
+                ('Customer', 'Order', 'creates'),
+                ('Employee', 'Order', 'fulfills'),
+                ('Inventory', 'Book', 'contains')
+            ]
+            
+            for source, target, relation in relationships:
+                G.add_edge(source, target, label=relation)
+            
+            self.structure_layout = G, nx.spring_layout(G, k=3, iterations=50, seed=0)
+        G, pos = self.structure_layout
         
         # Draw nodes
         node_colors = ['lightblue' if node in ['Book', 'Customer', 'Employee'] 
@@ -599,11 +829,11 @@ class BookstoreGUI:
         
         self.onto_canvas.draw()
     
-    def _create_instances_diagram(self, G):
+    def _create_instances_diagram(self):
         """Create diagram showing actual instances and their relationships"""
-        # Add instances if model exists
-        if not self.model:
-            self.onto_ax.text(0.5, 0.5, 'Start simulation to see instances', 
+        # Add instances from the last ontology view
+        if not self.ontology:
+            self.onto_ax.text(0.5, 0.5, 'Start simulation and refresh to see instances', 
                              transform=self.onto_ax.transAxes, ha='center', va='center',
                              fontsize=14, bbox=dict(boxstyle="round,pad=0.3", facecolor="lightyellow"))
             self.onto_ax.set_title("Ontology Instances (No Active Simulation)", fontsize=12)
@@ -611,65 +841,40 @@ class BookstoreGUI:
             self.onto_canvas.draw()
             return
         
-        # Get actual instances from the simulation
-        books = list(Book.instances())[:5]  # Show first 5 books
-        customers = list(Customer.instances())[:3]  # Show first 3 customers
-        employees = list(Employee.instances())  # Show all employees
-        orders = list(Order.instances())[:5]  # Show first 5 orders
-        
-        # Add nodes for instances
-        for i, book in enumerate(books):
-            name = book.hasName[0] if book.hasName else f'Book_{i}'
-            G.add_node(f"Book: {name[:15]}", node_type='book_instance')
-        
-        for i, customer in enumerate(customers):
-            name = customer.hasName[0] if customer.hasName else f'Customer_{i}'
-            G.add_node(f"Cust: {name}", node_type='customer_instance')
-        
-        for i, employee in enumerate(employees):
-            name = employee.hasName[0] if employee.hasName else f'Employee_{i}'
-            G.add_node(f"Emp: {name}", node_type='employee_instance')
-        
-        # Add purchase relationships
-        for customer in customers:
-            customer_name = f"Cust: {customer.hasName[0]}" if customer.hasName else f"Cust: Customer_{customers.index(customer)}"
-            if customer.purchases:
-                for book in customer.purchases[:2]:  # Show max 2 purchases per customer
-                    book_name = f"Book: {book.hasName[0][:15]}" if book.hasName else f"Book: {book}"
-                    if book_name in G.nodes():
-                        G.add_edge(customer_name, book_name, label='purchases')
-        
-        # Create layout
-        pos = nx.spring_layout(G, k=2, iterations=50)
-        
-        # Draw nodes with different colors for different types
-        node_colors = []
-        for node in G.nodes():
-            if 'Book:' in node:
-                node_colors.append('lightcoral')
-            elif 'Cust:' in node:
-                node_colors.append('lightblue')
-            elif 'Emp:' in node:
-                node_colors.append('lightgreen')
-            else:
-                node_colors.append('lightyellow')
+        G, labels = self._instances_graph(self.ontology, self.diagram_budget)
+        pos = self._layout_instances(G)
+        
+        # Draw nodes with different colors for different types; genre
+        # clusters grow with their number of books
+        colors = {'genre': 'khaki', 'book': 'lightcoral', 'customer': 'lightblue', 'employee': 'lightgreen'}
+        most_books = max([G.nodes[node].get('books', 0) for node in G] + [1])
+        node_colors = [colors[G.nodes[node]['kind']] for node in G]
+        node_sizes = [600 + 2400 * G.nodes[node]['books'] / most_books if G.nodes[node]['kind'] == 'genre'
+                      else 500 for node in G]
         
         nx.draw_networkx_nodes(G, pos, node_color=node_colors, 
-                              node_size=1500, alpha=0.9, ax=self.onto_ax)
+                              node_size=node_sizes, alpha=0.9, ax=self.onto_ax)
         
         # Draw edges
         nx.draw_networkx_edges(G, pos, edge_color='gray', 
-                              arrows=True, arrowsize=15, 
+                              arrows=True, arrowsize=10, 
                               arrowstyle='->', ax=self.onto_ax)
         
         # Draw labels
-        nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold', ax=self.onto_ax)
-        
-        self.onto_ax.set_title("Ontology Instances and Relationships", fontsize=12, fontweight='bold')
+        nx.draw_networkx_labels(G, pos, labels, font_size=7, ax=self.onto_ax)
+        
+        counts = self.ontology['counts']
+        shown = {kind: sum(1 for node in G if G.nodes[node]['kind'] == kind) for kind in colors}
+        self.onto_ax.set_title(
+            f"Ontology Instances: {len(self.ontology['genres'])} genres ({counts['Book']} books), "
+            f"{shown['customer']} of {counts['Customer']} customers, {shown['book']} purchased books",
+            fontsize=10, fontweight='bold')
         self.onto_ax.axis('off')
         
         # Add legend
         legend_elements = [
+            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='khaki', 
+                      markersize=10, label='Genres (all books)'),
             plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='lightcoral', 
                       markersize=10, label='Books'),
             plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='lightblue', 
@@ -681,6 +886,67 @@ class BookstoreGUI:
         
         self.onto_canvas.draw()
     
+    def _instances_graph(self, view, budget):
+        """Graph of an ontology view with at most budget nodes, and its labels.
+        
+        Every genre is one cluster node standing in for all of its books. The
+        most active customers and the books they bought are added until the
+        budget is spent.
+        """
+        G = nx.DiGraph()
+        labels = {}
+        for genre, counts in view['genres'].items():
+            node = f"genre:{genre}"
+            G.add_node(node, kind='genre', books=counts['books'])
+            labels[node] = f"{genre}\n{counts['books']} books\n{counts['purchases']} sold"
+        
+        for name in view['employees'][:3]:
+            node = f"employee:{name}"
+            G.add_node(node, kind='employee')
+            labels[node] = name
+        
+        for name, purchases in view['customers']:
+            if len(G) >= budget:
+                break
+            customer = f"customer:{name}"
+            G.add_node(customer, kind='customer')
+            labels[customer] = name
+            for title, genre in purchases[:4]:  # Show max 4 purchases per customer
+                book = f"book:{title}"
+                if book not in G:
+                    if len(G) >= budget:
+                        continue
+                    G.add_node(book, kind='book')
+                    labels[book] = title[:15]
+                    if f"genre:{genre}" in G:
+                        G.add_edge(book, f"genre:{genre}", label='hasGenre')
+                G.add_edge(customer, book, label='purchases')
+        return G, labels
+    
+    def _layout_instances(self, G):
+        """Spring layout that starts from the cached position of every known individual.
+        
+        New nodes start next to a neighbour that already has a position, so
+        a refresh only nudges the diagram instead of reshuffling it.
+        """
+        cache = self.node_positions
+        initial = {node: cache[node] for node in G if node in cache}
+        new_nodes = [node for node in G if node not in initial]
+        for node in new_nodes:
+            anchor = next((initial[other] for other in nx.all_neighbors(G, node) if other in initial), None)
+            if anchor is None:
+                anchor = self.layout_rng.uniform(-1, 1, 2)
+            initial[node] = np.asarray(anchor) + self.layout_rng.uniform(-0.1, 0.1, 2)
+        
+        iterations = 50 if len(new_nodes) > len(G) // 4 else 10
+        pos = nx.spring_layout(G, pos=initial, k=1.5 / np.sqrt(max(len(G), 1)), iterations=iterations, seed=0)
+        
+        # Keep the cache bounded by forgetting individuals no longer shown
+        if len(cache) > 10 * self.diagram_budget:
+            cache.clear()
+        cache.update(pos)
+        return pos
+    
     def toggle_ontology_view(self):
         """Toggle between structure and instances view"""
         if self.diagram_view.get() == "structure":
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vectorized_engine import run_engine
+
+# Final statistics are compared with a two-sample test over the seeds: the
+# difference of the per-engine means must lie within MAX_STANDARD_ERRORS of
+# its standard error. Single runs differ, so fixed relative tolerances only
+# hold for the seeds they were tuned on. The contended configuration has far
+# more buyers than copies, so books sell out and are restocked mid-step.
+MAX_STANDARD_ERRORS = 4.0
+
+STATISTICS = [
+    "Total Books",
+    "Total Stock",
+    "Total Sales",
+    "Average Customer Budget",
+    "Customer Satisfaction"
+]
+
+CONFIGURATIONS = {
+    "uncontended": dict(num_customers=200, num_employees=2, num_books=15, steps=30, seeds=range(20)),
+    "contended": dict(num_customers=2000, num_employees=2, num_books=15, steps=30, seeds=range(10))
+}
+
+@pytest.fixture(scope="module", params=sorted(CONFIGURATIONS))
+def finals(request):
+    config = CONFIGURATIONS[request.param]
+    return {engine: run_engine(engine, **config)[0] for engine in ("agent", "vectorized")}
+
+@pytest.mark.parametrize("statistic", STATISTICS)
+def test_final_statistics_agree(finals, statistic):
+    agent = np.array([final[statistic] for final in finals["agent"]], dtype=float)
+    vectorized = np.array([final[statistic] for final in finals["vectorized"]], dtype=float)
+    standard_error = np.sqrt(agent.var(ddof=1) / len(agent) + vectorized.var(ddof=1) / len(vectorized))
+    assert abs(vectorized.mean() - agent.mean()) <= MAX_STANDARD_ERRORS * standard_error
@@ -0,0 +1,246 @@
+import time
+import numpy as np
+
+# Vectorized (struct-of-arrays) engine for BookstoreModel.
+#
+# Books, customers and employees live in NumPy arrays instead of Mesa agents,
+# and each step runs the CustomerAgent / BookAgent / EmployeeAgent rules as
+# batched array operations. RandomActivation's interleaving is approximated
+# by shuffling every turn and running the book and employee rules between
+# sub-batches of customers, so restocks happen while the step is under way.
+# Single runs differ from the agent path but the collected statistics follow
+# the same behavior.
+
+class VectorizedEngine:
+    def __init__(self, book_data, num_customers, num_employees, customer_genres, rng,
+                 initial_stock=15, restock_threshold=5, employee_restock_threshold=5,
+                 ledger=None, customer_id_offset=0, sub_batches=32):
+        self.rng = rng
+        self.sub_batches = sub_batches
+        self.ledger = ledger  # optional OrderLedger receiving every sale
+        self.customer_id_offset = customer_id_offset
+
+        # Genre universe: every book genre plus every genre a customer may prefer
+        self.genres = list(dict.fromkeys([genre for _, _, genre, _ in book_data] + list(customer_genres)))
+        genre_index = {genre: i for i, genre in enumerate(self.genres)}
+        num_books = len(book_data)
+
+        # Book columns
+        self.titles = [title for title, _, _, _ in book_data]
+        self.book_genre = np.array([genre_index[genre] for _, _, genre, _ in book_data], dtype=np.int64)
+        self.price = np.array([price for _, _, _, price in book_data], dtype=np.float64)
+        self.stock = np.full(num_books, initial_stock, dtype=np.int64)
+        self.total_sales = np.zeros(num_books, dtype=np.int64)
+        self.threshold = np.full(num_books, restock_threshold, dtype=np.int64)
+
+        # Customer columns: budget, satisfaction and a boolean genre mask
+        self.budget = rng.uniform(50, 200, size=num_customers)
+        self.satisfaction = np.full(num_customers, 0.5)
+        self.genre_mask = np.zeros((num_customers, len(self.genres)), dtype=bool)
+        customer_genre_ids = np.array([genre_index[genre] for genre in customer_genres])
+        num_preferred = rng.integers(1, 4, size=num_customers)
+        for i, count in enumerate(num_preferred):
+            self.genre_mask[i, rng.choice(customer_genre_ids, size=count, replace=False)] = True
+
+        # Employee columns; each book is owned by employee book_id % num_employees
+        self.employee_threshold = np.full(num_employees, employee_restock_threshold, dtype=np.int64)
+        self.restock_actions = np.zeros(num_employees, dtype=np.int64)
+        self.owner = np.arange(num_books) % num_employees if num_employees else None
+        self.restocked = np.zeros(num_books, dtype=bool)  # restocked this step
+
+        # Throughput accounting
+        self.steps = 0
+        self.customer_steps = 0
+        self.elapsed = 0.0
+
+    @property
+    def num_books(self):
+        return len(self.price)
+
+    @property
+    def num_customers(self):
+        return len(self.budget)
+
+    def model_reporters(self):
+        """Return model reporters matching the agent path"""
+        return {
+            "Total Books": lambda m: m.engine.num_books,
+            "Total Stock": lambda m: int(m.engine.stock.sum()),
+            "Total Sales": lambda m: int(m.engine.total_sales.sum()),
+            "Average Customer Budget": lambda m: np.mean(m.engine.budget),
+            "Customer Satisfaction": lambda m: np.mean(m.engine.satisfaction)
+        }
+
+    def step(self):
+        """Advance all customers, books and employees by one step"""
+        start = time.perf_counter()
+        self.restocked[:] = False
+
+        # Shuffle the browsing customers' turns together with the book and
+        # employee turns, as RandomActivation does. The book and employee turns
+        # cut the customers into sub-batches; when there are more turns than
+        # sub-batches, neighbouring turns are taken together.
+        browsing = np.flatnonzero((self.budget > 10) & (self.rng.random(self.num_customers) < 0.3))
+        num_rules = self.num_books + len(self.employee_threshold)
+        turns = self.rng.permutation(len(browsing) + num_rules)
+        is_rule = turns >= len(browsing)
+        rules_before = np.cumsum(is_rule)
+        customer_batch = rules_before[~is_rule] * self.sub_batches // (num_rules + 1)
+        rule_turns = turns[is_rule] - len(browsing)
+        rule_batch = (rules_before[is_rule] - 1) * self.sub_batches // (num_rules + 1)
+        customers = browsing[turns[~is_rule]]
+        for batch in np.unique(np.concatenate((customer_batch, rule_batch))):
+            self.browse_and_purchase(customers[customer_batch == batch])
+            active = np.zeros(num_rules, dtype=bool)
+            active[rule_turns[rule_batch == batch]] = True
+            self.book_step(active[:self.num_books])
+            self.check_and_restock(active[self.num_books:])
+
+        self.steps += 1
+        self.customer_steps += self.num_customers
+        self.elapsed += time.perf_counter() - start
+
+    def throughput(self):
+        """Customer-steps simulated per second of engine time"""
+        return self.customer_steps / self.elapsed if self.elapsed else 0.0
+
+    def pick_books(self, customers):
+        """Pick one in-stock book per customer, preferring their genres.
+
+        Each pick is uniform over the in-stock books in the customer's
+        preferred genres, falling back to any in-stock book. Returns -1 when
+        nothing is in stock.
+        """
+        in_stock = np.flatnonzero(self.stock > 0)
+        if len(in_stock) == 0:
+            return np.full(len(customers), -1, dtype=np.int64)
+
+        # In-stock books grouped by genre, with per-genre counts and offsets
+        by_genre = in_stock[np.argsort(self.book_genre[in_stock], kind='stable')]
+        counts = np.bincount(self.book_genre[in_stock], minlength=len(self.genres))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        masked = self.genre_mask[customers] * counts
+        totals = masked.sum(axis=1)
+        fallback = totals == 0
+        masked[fallback] = counts
+        totals[fallback] = len(in_stock)
+
+        # Draw a rank in [0, total) and locate its genre and offset
+        ranks = np.floor(self.rng.random(len(customers)) * totals).astype(np.int64)
+        cumulative = np.cumsum(masked, axis=1)
+        genre = (cumulative <= ranks[:, None]).sum(axis=1)
+        rows = np.arange(len(customers))
+        offset = ranks - (cumulative[rows, genre] - masked[rows, genre])
+        return by_genre[starts[genre] + offset]
+
+    def browse_and_purchase(self, customers):
+        """Customers, in the given order, pick a book and buy it if affordable.
+
+        Customers whose book sold out to earlier buyers pick again from the
+        books still in stock, as they would have seen them at their turn.
+        """
+        while len(customers):
+            books = self.pick_books(customers)
+
+            wants = books >= 0
+            wants[wants] = self.price[books[wants]] <= self.budget[customers[wants]]
+            customers, books = customers[wants], books[wants]
+
+            # Buyers of the same book are served in order until it sells out
+            order = np.argsort(books, kind='stable')
+            sorted_books = books[order]
+            group_start = np.searchsorted(sorted_books, sorted_books, side='left')
+            rank = np.empty(len(books), dtype=np.int64)
+            rank[order] = np.arange(len(books)) - group_start
+            bought = rank < self.stock[books]
+            self.purchase(customers[bought], books[bought])
+            customers = customers[~bought]
+
+    def purchase(self, customers, books):
+        """Record one sale per (customer, book) pair"""
+        if self.ledger is not None:
+            self.ledger.extend(customers + self.customer_id_offset, books, self.price[books], self.steps)
+        self.budget[customers] -= self.price[books]
+        self.satisfaction[customers] = np.minimum(1.0, self.satisfaction[customers] + 0.1)
+        sold = np.bincount(books, minlength=self.num_books)
+        self.stock -= sold
+        self.total_sales += sold
+
+    def book_step(self, active):
+        """Restock requests for low-stock books and demand-based price adjustment.
+
+        Only the books in the boolean mask `active` take their turn.
+        """
+        low = np.flatnonzero(active & (self.stock <= self.threshold) & ~self.restocked)
+        if len(low) and self.owner is not None:
+            # The owning employee answers each restock_needed request once per step
+            self.restock(low)
+
+        adjust = active & (self.rng.random(self.num_books) < 0.1)
+        high_demand = self.total_sales > 5
+        low_demand = ~high_demand & (self.total_sales == 0) & (self.stock > 10)
+        self.price[adjust & high_demand] *= 1.05
+        self.price[adjust & low_demand] *= 0.95
+
+    def check_and_restock(self, active):
+        """Owners restock their low books with 70% chance, skipping books already restocked.
+
+        Only the employees in the boolean mask `active` take their turn.
+        """
+        if self.owner is None or not active.any():
+            return
+        low = active[self.owner] & (self.stock <= self.employee_threshold[self.owner])
+        restock = low & ~self.restocked & (self.rng.random(self.num_books) < 0.7)
+        self.restock(np.flatnonzero(restock))
+
+    def restock(self, books):
+        """Add 10-20 copies to each book and credit the owning employee"""
+        self.stock[books] += self.rng.integers(10, 21, size=len(books))
+        self.restocked[books] = True
+        self.restock_actions += np.bincount(self.owner[books], minlength=len(self.employee_threshold))
+
+def run_engine(engine, num_customers=200, num_employees=2, num_books=15, steps=30, seeds=range(5)):
+    """Run one engine once per seed.
+
+    Returns the final collected statistics of each run and the total time
+    spent stepping the models.
+    """
+    import contextlib
+    import io
+    from bookstore_system import BookstoreModel
+
+    finals = []
+    elapsed = 0.0
+    for seed in seeds:
+        with contextlib.redirect_stdout(io.StringIO()):
+            model = BookstoreModel(num_customers, num_employees, num_books, engine=engine,
+                                   seed=seed)
+            start = time.perf_counter()
+            for _ in range(steps):
+                model.step()
+            elapsed += time.perf_counter() - start
+            model.datacollector.collect(model)
+        finals.append(model.datacollector.latest())
+        model.close()
+    return finals, elapsed
+
+def compare_engines(num_customers=200, num_employees=2, num_books=15, steps=30, seeds=range(5)):
+    """Run the agent and vectorized engines side by side.
+
+    Returns, per engine, the mean of the final collected statistics over one
+    run per seed and the throughput in customer-steps per second.
+    """
+    results = {}
+    for engine in ("agent", "vectorized"):
+        finals, elapsed = run_engine(engine, num_customers, num_employees, num_books, steps, seeds)
+        summary = {key: float(np.mean([final[key] for final in finals])) for key in finals[0]}
+        summary["Customer-steps/s"] = num_customers * steps * len(finals) / elapsed
+        results[engine] = summary
+    return results
+
+if __name__ == "__main__":
+    comparison = compare_engines()
+    for key in comparison["agent"]:
+        print(f"{key:28s} agent={comparison['agent'][key]:12.2f}  "
+              f"vectorized={comparison['vectorized'][key]:12.2f}")